@@ -0,0 +1,162 @@
+'''
+Analítica de salarios sobre una foto (snapshot) columnar del padrón de colaboradores
+
+En lugar de recorrer objetos Colaborador uno por uno, RosterColumnar carga la tabla colaboradores
+(con los datos de ambos subtipos) en arreglos de NumPy, una columna por atributo, y resuelve
+agrupamientos, filtros y percentiles con operaciones vectorizadas:
+
+    roster = RosterColumnar.cargar(GestionColaboradores())
+    roster.por_departamento()
+    roster.ajustar_salarios(gestion, 8, departamento='Ventas') ### +8% para Ventas
+'''
+
+import numpy as np
+
+SEMANAS_POR_MES = 52 / 12
+
+class RosterColumnar:
+    '''
+    Snapshot columnar: dni, edad, salario, tipo, código de departamento y horas semanales.
+    Los departamentos se guardan como códigos enteros (índice en la lista departamentos, -1 si no tiene)
+    '''
+    TIEMPO_COMPLETO = 0
+    TIEMPO_PARCIAL = 1
+    SIN_TIPO = 2
+
+    def __init__(self, dni, edad, salario, tipo, departamento, horas_semanales, departamentos) -> None:
+        self.dni = dni
+        self.edad = edad
+        self.salario = salario
+        self.tipo = tipo
+        self.departamento = departamento
+        self.horas_semanales = horas_semanales
+        self.departamentos = departamentos
+
+    @classmethod
+    def cargar(cls, gestion, tamano_lote=10_000):
+        '''
+        Lee el padrón completo en lotes (sin instanciar colaboradores) y arma las columnas.
+        Cada lote se convierte a arreglos apenas llega, así no se acumulan las filas como objetos de Python
+        '''
+        codigos = {}
+        columnas = {'dni': [], 'edad': [], 'salario': [], 'tipo': [], 'departamento': [], 'horas_semanales': []}
+        for filas in gestion._leer_filas(tamano_lote, dictionary=False):
+            dni, _, _, edad, salario, departamento, horas = zip(*filas)
+            columnas['dni'].append(np.array(dni, dtype=np.int64))
+            columnas['edad'].append(np.array(edad, dtype=np.int16))
+            columnas['salario'].append(np.array(salario, dtype=np.float64))
+            columnas['departamento'].append(np.array(
+                [-1 if nombre is None else codigos.setdefault(nombre, len(codigos)) for nombre in departamento],
+                dtype=np.int32))
+            columnas['horas_semanales'].append(np.array([0 if valor is None else valor for valor in horas], dtype=np.float64))
+            columnas['tipo'].append(np.array(
+                [cls.TIEMPO_COMPLETO if nombre is not None else cls.TIEMPO_PARCIAL if valor is not None else cls.SIN_TIPO
+                 for nombre, valor in zip(departamento, horas)],
+                dtype=np.int8))
+
+        vacias = {'dni': np.int64, 'edad': np.int16, 'salario': np.float64, 'tipo': np.int8,
+                  'departamento': np.int32, 'horas_semanales': np.float64}
+        arreglos = {nombre: np.concatenate(partes) if partes else np.empty(0, dtype=vacias[nombre])
+                    for nombre, partes in columnas.items()}
+        return cls(departamentos=list(codigos), **arreglos)
+
+    def __len__(self):
+        return len(self.dni)
+
+    def codigo_departamento(self, nombre):
+        try:
+            return self.departamentos.index(nombre)
+        except ValueError:
+            raise ValueError(f'No hay colaboradores en el departamento {nombre}')
+
+    def mascara(self, departamento=None, tipo=None, edad_min=None, edad_max=None, salario_min=None, salario_max=None):
+        '''
+        Arreglo booleano con los colaboradores que cumplen todos los filtros indicados
+        '''
+        mascara = np.ones(len(self), dtype=bool)
+        if departamento is not None:
+            mascara &= self.departamento == self.codigo_departamento(departamento)
+        if tipo is not None:
+            mascara &= self.tipo == tipo
+        if edad_min is not None:
+            mascara &= self.edad >= edad_min
+        if edad_max is not None:
+            mascara &= self.edad <= edad_max
+        if salario_min is not None:
+            mascara &= self.salario >= salario_min
+        if salario_max is not None:
+            mascara &= self.salario <= salario_max
+        return mascara
+
+    def filtrar(self, mascara=None, **filtros):
+        '''
+        Devuelve otro RosterColumnar sólo con las filas seleccionadas (por máscara o por los filtros de mascara())
+        '''
+        if mascara is None:
+            mascara = self.mascara(**filtros)
+        return RosterColumnar(self.dni[mascara], self.edad[mascara], self.salario[mascara], self.tipo[mascara],
+                              self.departamento[mascara], self.horas_semanales[mascara], self.departamentos)
+
+    def por_departamento(self):
+        '''
+        Cantidad, total y promedio de salarios por departamento (sólo tiempo completo)
+        '''
+        completos = self.departamento >= 0
+        codigos = self.departamento[completos]
+        cantidades = np.bincount(codigos, minlength=len(self.departamentos))
+        totales = np.bincount(codigos, weights=self.salario[completos], minlength=len(self.departamentos))
+        return {
+            nombre: {
+                'cantidad': int(cantidades[codigo]),
+                'total': float(totales[codigo]),
+                'promedio': float(totales[codigo] / cantidades[codigo]) if cantidades[codigo] else 0.0
+            }
+            for codigo, nombre in enumerate(self.departamentos)
+        }
+
+    def percentiles(self, percentiles=(25, 50, 75, 90, 99), columna='salario'):
+        valores = getattr(self, columna)
+        if not len(valores):
+            return {p: None for p in percentiles}
+        return dict(zip(percentiles, np.percentile(valores, percentiles).tolist()))
+
+    def bandas_salariales(self, limites):
+        '''
+        Cantidad de colaboradores en cada banda [limites[i], limites[i+1]).
+        Las bandas extremas cuentan lo que quede por debajo del primer límite y desde el último
+        '''
+        cantidades = np.bincount(np.digitize(self.salario, limites), minlength=len(limites) + 1)
+        etiquetas = [f'< {limites[0]}'] + [f'{desde} - {hasta}' for desde, hasta in zip(limites, limites[1:])] + [f'>= {limites[-1]}']
+        return dict(zip(etiquetas, cantidades.tolist()))
+
+    def costo_tiempo_parcial(self):
+        '''
+        Costo de los colaboradores de tiempo parcial ponderado por sus horas:
+        salario total, horas mensuales totales y costo promedio por hora
+        '''
+        parciales = self.tipo == self.TIEMPO_PARCIAL
+        salario_total = float(self.salario[parciales].sum())
+        horas_mensuales = float(self.horas_semanales[parciales].sum() * SEMANAS_POR_MES)
+        return {
+            'cantidad': int(parciales.sum()),
+            'salario_total': salario_total,
+            'horas_mensuales': horas_mensuales,
+            'costo_por_hora': salario_total / horas_mensuales if horas_mensuales else 0.0
+        }
+
+    def ajustar_salarios(self, gestion, porcentaje, mascara=None, **filtros):
+        '''
+        Aplica un ajuste porcentual (por ej. 8 => +8%) a los colaboradores seleccionados,
+        lo calcula en forma vectorizada y lo guarda en la BBDD con actualizaciones masivas
+        en vez de llamar a actualizar_colaborador por cada DNI.
+        Devuelve el reporte de actualizar_salarios ({dni: estado}, más la lista 'duplicados')
+        '''
+        if mascara is None:
+            mascara = self.mascara(**filtros)
+        nuevos = np.round(self.salario[mascara] * (1 + porcentaje / 100), 2)
+        reporte = gestion.actualizar_salarios(zip(self.dni[mascara].tolist(), nuevos.tolist()))
+        ### La foto queda al día sólo con lo que efectivamente se guardó
+        guardados = np.array([reporte.get(dni) == 'actualizado' for dni in self.dni[mascara].tolist()], dtype=bool)
+        indices = np.flatnonzero(mascara)[guardados]
+        self.salario[indices] = nuevos[guardados]
+        return reporte
@@ -0,0 +1,573 @@
+'''
+Benchmark de las operaciones CRUD de GestionColaboradores
+
+Genera poblaciones sintéticas reproducibles (misma semilla => mismos datos), las carga en una
+BBDD SQLite local que hace de "stand-in" del servidor y mide throughput y latencias (p50/p95/p99)
+de cada operación a distintos tamaños de la tabla colaboradores.
+El resultado se emite como JSON para poder comparar corridas y detectar regresiones:
+
+    python benchmark.py --salida resultados.json crud --tamanos 1000 100000 1000000
+
+También mide la memoria por objeto y el costo de acceso a atributos de los colaboradores:
+
+    python benchmark.py memoria --instancias 1000000
+
+Y las búsquedas por prefijo de apellido (índice en memoria y, opcionalmente, la BBDD):
+
+    python benchmark.py prefijos --filas 1000000 --bbdd
+
+Y la concurrencia de altas, upserts y bajas sobre los mismos DNI desde muchos hilos
+(verifica que cada DNI se cree y se elimine una sola vez y que no queden filas huérfanas;
+si encuentra una inconsistencia termina con código de salida 1):
+
+    python benchmark.py concurrencia --hilos 16 --dnis 50 --rondas 20
+
+Y la lectura del padrón completo en serie contra la carga en paralelo (hilos o procesos):
+
+    python benchmark.py hidratacion --filas 1000000 --trabajadores 1 2 4 8 --procesos
+
+Y el listado con objetos completos contra la consulta proyectada con proxies de carga diferida:
+
+    python benchmark.py listado --filas 1000000
+
+Y el tiempo de arranque en frío de main.py para comandos que no usan la BBDD:
+
+    python benchmark.py arranque --repeticiones 30
+'''
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from poo import (
+    BackendSQLite,
+    CacheColaboradores,
+    ColaboradorTiempoCompleto,
+    ColaboradorTiempoParcial,
+    GestionColaboradores,
+    IndicePrefijos,
+    PoolConexiones
+)
+
+DEPARTAMENTOS = ['Administracion', 'Finanzas', 'Legales', 'Marketing', 'Operaciones', 'RRHH', 'Sistemas', 'Ventas']
+NOMBRES = ['Ana', 'Carlos', 'Diego', 'Elena', 'Florencia', 'Gabriel', 'Julieta', 'Lucas', 'Martina', 'Sofia']
+APELLIDOS = ['Alvarez', 'Benitez', 'Diaz', 'Fernandez', 'Garcia', 'Gomez', 'Lopez', 'Martinez', 'Perez', 'Romero']
+
+def generar_dnis(cantidad, semilla):
+    '''
+    DNI únicos de 7 u 8 dígitos, siempre los mismos para la misma semilla
+    '''
+    return random.Random(semilla).sample(range(1_000_000, 100_000_000), cantidad)
+
+def generar_poblacion(dnis, proporcion_completo=0.7, semilla=0):
+    '''
+    Generador de registros (diccionarios como los de la importación) para los DNI dados.
+    proporcion_completo es la fracción de colaboradores de tiempo completo; el resto es de tiempo parcial
+    '''
+    azar = random.Random(semilla)
+    for dni in dnis:
+        registro = {
+            'dni': dni,
+            'nombre': azar.choice(NOMBRES),
+            'apellido': azar.choice(APELLIDOS),
+            'edad': azar.randint(18, 65),
+            'salario': round(azar.uniform(300_000, 3_000_000), 2)
+        }
+        if azar.random() < proporcion_completo:
+            registro['departamento'] = azar.choice(DEPARTAMENTOS)
+        else:
+            registro['horas_semanales'] = azar.randint(10, 30)
+        yield registro
+
+def colaborador_desde_registro(registro):
+    comunes = (registro['dni'], registro['nombre'], registro['apellido'], registro['edad'], registro['salario'])
+    if 'departamento' in registro:
+        return ColaboradorTiempoCompleto(*comunes, registro['departamento'])
+    return ColaboradorTiempoParcial(*comunes, registro['horas_semanales'])
+
+def resumir(latencias, filas=None):
+    '''
+    Throughput y percentiles (en milisegundos) de una lista de latencias en segundos
+    '''
+    total = sum(latencias)
+    resumen = {
+        'operaciones': len(latencias),
+        'segundos': round(total, 6),
+        'operaciones_por_segundo': round(len(latencias) / total, 2) if total else None
+    }
+    if len(latencias) > 1:
+        percentiles = statistics.quantiles(latencias, n=100, method='inclusive')
+        resumen.update({
+            'p50_ms': round(percentiles[49] * 1000, 4),
+            'p95_ms': round(percentiles[94] * 1000, 4),
+            'p99_ms': round(percentiles[98] * 1000, 4)
+        })
+    else:
+        resumen.update({clave: round(latencias[0] * 1000, 4) for clave in ('p50_ms', 'p95_ms', 'p99_ms')})
+    if filas is not None:
+        resumen['filas_por_segundo'] = round(filas / total, 2) if total else None
+    return resumen
+
+def medir(funcion, argumentos):
+    latencias = []
+    for argumento in argumentos:
+        inicio = time.perf_counter()
+        funcion(*argumento)
+        latencias.append(time.perf_counter() - inicio)
+    return latencias
+
+def crear_gestion(ruta, con_cache=False):
+    gestion = GestionColaboradores(BackendSQLite(ruta))
+    if not con_cache: ### Sin cache se mide el camino completo hasta la BBDD
+        gestion.cache = CacheColaboradores(tamano=0)
+    return gestion
+
+def correr(tamano, operaciones, proporcion_completo, semilla, directorio, con_cache=False, recorridos=3):
+    '''
+    Carga una población de "tamano" colaboradores y mide cada operación CRUD sobre ella
+    '''
+    gestion = crear_gestion(os.path.join(directorio, f'benchmark_{tamano}.db'), con_cache)
+    dnis = generar_dnis(tamano + operaciones, semilla)
+    existentes, nuevos = dnis[:tamano], dnis[tamano:]
+    azar = random.Random(semilla + 1)
+    muestra = [azar.choice(existentes) for _ in range(operaciones)]
+    nuevos_colaboradores = [colaborador_desde_registro(registro)
+                            for registro in generar_poblacion(nuevos, proporcion_completo, semilla + 2)]
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull): ### Los métodos CRUD imprimen mensajes
+        inicio = time.perf_counter()
+        reporte = gestion.crear_colaboradores_bulk(generar_poblacion(existentes, proporcion_completo, semilla))
+        carga = time.perf_counter() - inicio
+
+        resultados = {
+            'crear_colaborador': resumir(medir(gestion.crear_colaborador, [(c,) for c in nuevos_colaboradores])),
+            'leer_colaborador': resumir(medir(gestion.leer_colaborador, [(dni,) for dni in muestra])),
+            'actualizar_colaborador': resumir(medir(gestion.actualizar_colaborador,
+                                                    [(dni, round(azar.uniform(300_000, 3_000_000), 2)) for dni in muestra])),
+            'eliminar_colaborador': resumir(medir(gestion.eliminar_colaborador, [(dni,) for dni in nuevos])),
+            'leer_todos_los_colaboradores': resumir(
+                medir(lambda: sum(1 for _ in gestion.leer_todos_los_colaboradores()), [()] * recorridos),
+                filas=tamano * recorridos)
+        }
+    gestion.pool.cerrar()
+
+    return {
+        'tamano': tamano,
+        'carga': {
+            'insertados': reporte['insertados'],
+            'rechazados': len(reporte['rechazados']),
+            'segundos': round(carga, 6),
+            'filas_por_segundo': round(tamano / carga, 2) if carga else None
+        },
+        'operaciones': resultados
+    }
+
+class ColaboradorConDict:
+    '''
+    Réplica de la representación anterior de Colaborador (atributos en __dict__ y capitalize()
+    en cada acceso), sólo para comparar contra la versión con __slots__
+    '''
+    def __init__(self, dni, nombre, apellido, edad, salario, departamento) -> None:
+        self.__dni = int(dni)
+        self.__nombre = nombre
+        self.__apellido = apellido
+        self.__edad = edad
+        self.__salario = float(salario)
+        self.__departamento = departamento
+
+    @property
+    def nombre(self):
+        return self.__nombre.capitalize()
+
+    @property
+    def apellido(self):
+        return self.__apellido.capitalize()
+
+    @property
+    def salario(self):
+        return self.__salario
+
+def medir_memoria(clase, cantidad, semilla):
+    '''
+    Bytes por instancia (tracemalloc) y nanosegundos por acceso a nombre/apellido/salario
+    '''
+    azar = random.Random(semilla)
+    datos = [(dni, azar.choice(NOMBRES).lower(), azar.choice(APELLIDOS).lower(), azar.randint(18, 65),
+              round(azar.uniform(300_000, 3_000_000), 2), azar.choice(DEPARTAMENTOS))
+             for dni in generar_dnis(cantidad, semilla)]
+
+    gc.collect()
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    instancias = [clase(*fila) for fila in datos]
+    despues = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    lista = sys.getsizeof(instancias) ### La lista en sí no es parte del costo por objeto
+    inicio = time.perf_counter()
+    for instancia in instancias:
+        instancia.nombre
+        instancia.apellido
+        instancia.salario
+    acceso = time.perf_counter() - inicio
+
+    return {
+        'instancias': cantidad,
+        'bytes_por_instancia': round((despues - antes - lista) / cantidad, 1),
+        'ns_por_acceso': round(acceso / (cantidad * 3) * 1e9, 1)
+    }
+
+def benchmark_memoria(argumentos):
+    return {
+        'parametros': {'instancias': argumentos.instancias, 'semilla': argumentos.semilla, 'python': platform.python_version()},
+        'con_slots': medir_memoria(ColaboradorTiempoCompleto, argumentos.instancias, argumentos.semilla),
+        'con_dict': medir_memoria(ColaboradorConDict, argumentos.instancias, argumentos.semilla)
+    }
+
+def benchmark_prefijos(argumentos):
+    '''
+    Búsquedas por prefijo de apellido: en el índice en memoria (IndicePrefijos) y,
+    con --bbdd, también con buscar_colaboradores sobre SQLite con sus índices
+    '''
+    dnis = generar_dnis(argumentos.filas, argumentos.semilla)
+    azar = random.Random(argumentos.semilla + 1)
+    prefijos = [apellido[:azar.randint(1, 4)] for apellido in (azar.choice(APELLIDOS) for _ in range(argumentos.consultas))]
+
+    inicio = time.perf_counter()
+    indice = IndicePrefijos('apellido', ((registro['apellido'], registro['dni'])
+                                         for registro in generar_poblacion(dnis, semilla=argumentos.semilla)))
+    armado = time.perf_counter() - inicio
+    resultado = {
+        'parametros': {'filas': argumentos.filas, 'consultas': argumentos.consultas, 'limite': argumentos.limite,
+                       'semilla': argumentos.semilla, 'python': platform.python_version()},
+        'indice_en_memoria': {
+            'segundos_armado': round(armado, 6),
+            'buscar': resumir(medir(indice.buscar, [(prefijo, argumentos.limite) for prefijo in prefijos]))
+        }
+    }
+
+    if argumentos.bbdd:
+        with tempfile.TemporaryDirectory() as directorio:
+            gestion = crear_gestion(os.path.join(directorio, 'prefijos.db'))
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                gestion.crear_colaboradores_bulk(generar_poblacion(dnis, semilla=argumentos.semilla))
+            ### Primera página y una página profunda (keyset) para cada prefijo
+            paginas = []
+            for prefijo in prefijos:
+                _, siguiente = gestion.buscar_colaboradores(apellido=prefijo, limite=argumentos.limite * 20)
+                paginas.append((prefijo, siguiente))
+            resultado['bbdd'] = {
+                'primera_pagina': resumir(medir(lambda prefijo: gestion.buscar_colaboradores(apellido=prefijo, limite=argumentos.limite),
+                                                [(prefijo,) for prefijo in prefijos])),
+                'pagina_profunda': resumir(medir(lambda prefijo, siguiente: gestion.buscar_colaboradores(
+                                                     apellido=prefijo, despues_de=siguiente, limite=argumentos.limite),
+                                                 paginas))
+            }
+            gestion.pool.cerrar()
+    return resultado
+
+def benchmark_concurrencia(argumentos):
+    '''
+    En cada ronda todos los hilos intentan a la vez (con una barrera entre fases):
+    crear los mismos DNI, hacerles upsert con datos distintos y eliminarlos.
+    Cada DNI debe crearse y eliminarse exactamente una vez por ronda, y tras los upserts
+    cada colaborador debe tener una sola fila de subtipo.
+    Corre sobre SQLite, que serializa las escrituras: no ejercita los bloqueos por fila de MySQL,
+    así que ese camino sigue sin verificar con este benchmark
+    '''
+    dnis = generar_dnis(argumentos.dnis, argumentos.semilla)
+    barrera = threading.Barrier(argumentos.hilos)
+    latencias = {'crear_colaborador': [], 'upsert_colaborador': [], 'eliminar_colaborador': []}
+    lock = threading.Lock()
+    errores = {'altas_duplicadas': 0, 'altas_perdidas': 0, 'bajas_duplicadas': 0, 'bajas_perdidas': 0, 'subtipos': 0}
+
+    def trabajador(numero, gestion, ronda):
+        azar = random.Random(argumentos.semilla * 1_000_003 + ronda * 1_009 + numero)
+        orden = dnis[:]
+        altas, bajas, propias = {}, {}, {nombre: [] for nombre in latencias}
+        fases = [
+            ('crear_colaborador', altas, lambda dni: gestion.crear_colaborador(
+                colaborador_desde_registro(next(generar_poblacion([dni], semilla=azar.random()))))),
+            ('upsert_colaborador', None, lambda dni: gestion.upsert_colaborador(
+                colaborador_desde_registro(next(generar_poblacion([dni], proporcion_completo=0.5, semilla=azar.random()))))),
+            ('eliminar_colaborador', bajas, gestion.eliminar_colaborador)
+        ]
+        for nombre, exitos, operacion in fases:
+            azar.shuffle(orden)
+            barrera.wait()
+            for dni in orden:
+                inicio = time.perf_counter()
+                resultado = operacion(dni)
+                propias[nombre].append(time.perf_counter() - inicio)
+                if exitos is not None and resultado:
+                    exitos[dni] = exitos.get(dni, 0) + 1
+            barrera.wait()
+            if nombre == 'upsert_colaborador' and numero == 0:
+                errores['subtipos'] += verificar_subtipos(gestion)
+        with lock:
+            for nombre, valores in propias.items():
+                latencias[nombre].extend(valores)
+        return altas, bajas
+
+    def verificar_subtipos(gestion):
+        '''
+        Colaboradores sin exactamente una fila de subtipo
+        '''
+        with gestion.pool.conexion() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute('''
+                SELECT COUNT(*) FROM colaboradores c
+                WHERE (SELECT COUNT(*) FROM colaboradortiempocompleto tc WHERE tc.dni = c.dni)
+                    + (SELECT COUNT(*) FROM colaboradortiempoparcial tp WHERE tp.dni = c.dni) <> 1
+                ''')
+                return cursor.fetchone()[0]
+
+    with tempfile.TemporaryDirectory() as directorio:
+        gestion = crear_gestion(os.path.join(directorio, 'concurrencia.db'))
+        gestion.pool = PoolConexiones(gestion.connect, tamano=argumentos.hilos, timeout=60)
+        inicio = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), \
+                ThreadPoolExecutor(max_workers=argumentos.hilos) as executor:
+            for ronda in range(argumentos.rondas):
+                resultados = list(executor.map(trabajador, range(argumentos.hilos), [gestion] * argumentos.hilos,
+                                               [ronda] * argumentos.hilos))
+                for indice, clave in ((0, 'altas'), (1, 'bajas')):
+                    for dni in dnis:
+                        cantidad = sum(resultado[indice].get(dni, 0) for resultado in resultados)
+                        errores[f'{clave}_duplicadas'] += cantidad > 1
+                        errores[f'{clave}_perdidas'] += cantidad < 1
+        segundos = time.perf_counter() - inicio
+        with gestion.pool.conexion() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute('''
+                SELECT (SELECT COUNT(*) FROM colaboradores),
+                       (SELECT COUNT(*) FROM colaboradortiempocompleto) + (SELECT COUNT(*) FROM colaboradortiempoparcial)
+                ''')
+                restantes, huerfanas = cursor.fetchone()
+        gestion.pool.cerrar()
+
+    operaciones = sum(len(valores) for valores in latencias.values())
+    return {
+        'parametros': {'hilos': argumentos.hilos, 'dnis': argumentos.dnis, 'rondas': argumentos.rondas,
+                       'semilla': argumentos.semilla, 'backend': BackendSQLite.nombre, 'python': platform.python_version()},
+        'errores': errores,
+        'filas_restantes': restantes,
+        'filas_huerfanas': huerfanas,
+        'consistente': not any(errores.values()) and not restantes and not huerfanas,
+        'nota': 'SQLite serializa las escrituras; el camino MySQL (bloqueos por fila) no se verifica aquí',
+        'segundos': round(segundos, 6),
+        'operaciones_por_segundo': round(operaciones / segundos, 2) if segundos else None,
+        'operaciones': {nombre: resumir(valores) for nombre, valores in latencias.items()}
+    }
+
+def benchmark_hidratacion(argumentos):
+    '''
+    Lectura completa con leer_todos_los_colaboradores (en serie) contra leer_colaboradores_paralelo
+    con distintas cantidades de trabajadores. Verifica además que el orden sea el mismo
+    '''
+    dnis = generar_dnis(argumentos.filas, argumentos.semilla)
+    modos = [('hilos', False)] + ([('procesos', True)] if argumentos.procesos else [])
+    resultado = {
+        'parametros': {'filas': argumentos.filas, 'lote': argumentos.lote, 'semilla': argumentos.semilla,
+                       'cpus': os.cpu_count(), 'backend': BackendSQLite.nombre, 'python': platform.python_version()},
+    }
+    with tempfile.TemporaryDirectory() as directorio:
+        gestion = crear_gestion(os.path.join(directorio, 'hidratacion.db'))
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            gestion.crear_colaboradores_bulk(generar_poblacion(dnis, semilla=argumentos.semilla))
+
+        def recorrer(colaboradores):
+            orden = [colaborador.dni for colaborador in colaboradores]
+            return hash(tuple(orden)), len(orden)
+
+        referencia = None
+        latencias = []
+        for _ in range(argumentos.recorridos):
+            inicio = time.perf_counter()
+            referencia = recorrer(gestion.leer_todos_los_colaboradores(argumentos.lote))
+            latencias.append(time.perf_counter() - inicio)
+        resultado['serie'] = resumir(latencias, filas=referencia[1] * argumentos.recorridos)
+
+        for nombre, procesos in modos:
+            resultado[nombre] = {}
+            for trabajadores in argumentos.trabajadores:
+                latencias = []
+                mismo_orden = True
+                for _ in range(argumentos.recorridos):
+                    inicio = time.perf_counter()
+                    obtenido = recorrer(gestion.leer_colaboradores_paralelo(argumentos.lote, trabajadores, procesos))
+                    latencias.append(time.perf_counter() - inicio)
+                    mismo_orden &= obtenido == referencia
+                resumen = resumir(latencias, filas=referencia[1] * argumentos.recorridos)
+                resumen['mismo_orden'] = mismo_orden
+                resumen['aceleracion'] = round(resultado['serie']['segundos'] / resumen['segundos'], 3)
+                resultado[nombre][str(trabajadores)] = resumen
+        gestion.pool.cerrar()
+    return resultado
+
+def benchmark_listado(argumentos):
+    '''
+    Lo que hace el listado del menú (dni, apellido y departamento u horas) con objetos completos
+    y con leer_todos_los_colaboradores(columnas=('apellido',)); y el costo de usar un atributo no
+    traído (salario) en todos los proxies, tanto después de juntarlos en una lista como a medida que
+    se recorren (el caso que haría una consulta por fila si la carga no fuera por lote).
+    El recorrido en streaming usa un pool de una sola conexión: la carga diferida no puede pedir otra
+    '''
+    dnis = generar_dnis(argumentos.filas, argumentos.semilla)
+    with tempfile.TemporaryDirectory() as directorio:
+        gestion = crear_gestion(os.path.join(directorio, 'listado.db'))
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            gestion.crear_colaboradores_bulk(generar_poblacion(dnis, semilla=argumentos.semilla))
+
+        def listar(columnas):
+            return sum(len(f'{c.dni} {c.apellido} {getattr(c, "departamento", None) or getattr(c, "horas_semanales", None)}')
+                       for c in gestion.leer_todos_los_colaboradores(argumentos.lote, columnas=columnas))
+
+        def usar_salarios():
+            return sum(colaborador.salario for colaborador in list(gestion.leer_todos_los_colaboradores(
+                argumentos.lote, columnas=('apellido',))))
+
+        def usar_salarios_en_streaming():
+            return sum(colaborador.salario for colaborador in gestion.leer_todos_los_colaboradores(
+                argumentos.lote, columnas=('apellido',)))
+
+        filas = argumentos.filas * argumentos.recorridos
+        resultado = {
+            'parametros': {'filas': argumentos.filas, 'lote': argumentos.lote, 'semilla': argumentos.semilla,
+                           'backend': BackendSQLite.nombre, 'python': platform.python_version()},
+            'completo': resumir(medir(lambda: listar(None), [()] * argumentos.recorridos), filas=filas),
+            'proyectado': resumir(medir(lambda: listar(('apellido',)), [()] * argumentos.recorridos), filas=filas),
+            'proyectado_con_carga_diferida': resumir(medir(usar_salarios, [()] * argumentos.recorridos), filas=filas)
+        }
+        gestion.pool.cerrar()
+        gestion.pool = PoolConexiones(gestion.connect, tamano=1, timeout=5)
+        resultado['proyectado_con_carga_diferida_en_streaming'] = resumir(
+            medir(usar_salarios_en_streaming, [()] * argumentos.recorridos), filas=filas)
+        gestion.pool.cerrar()
+    resultado['aceleracion'] = round(resultado['completo']['segundos'] / resultado['proyectado']['segundos'], 3)
+    return resultado
+
+def benchmark_arranque(argumentos):
+    '''
+    Tiempo de arranque de procesos nuevos (como los de cron): main.py --help y la validación de un
+    archivo no deberían cargar el driver ni la configuración. Como referencia se mide el intérprete
+    vacío y lo que cuesta importar los módulos que se difieren
+    '''
+    directorio_repo = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as directorio:
+        archivo = os.path.join(directorio, 'colaboradores.jsonl')
+        with open(archivo, 'w', encoding='utf-8') as salida:
+            for registro in generar_poblacion(generar_dnis(100, argumentos.semilla), semilla=argumentos.semilla):
+                salida.write(json.dumps(registro) + '\n')
+        comandos = {
+            'interprete': [sys.executable, '-c', 'pass'],
+            'modulos_diferidos': [sys.executable, '-c', 'import asyncio, concurrent.futures, sqlite3, mysql.connector, decouple'],
+            'import_poo': [sys.executable, '-c', 'import poo'],
+            'main_help': [sys.executable, 'main.py', '--help'],
+            'main_validar': [sys.executable, 'main.py', 'import', archivo, '--validar']
+        }
+        resultado = {'parametros': {'repeticiones': argumentos.repeticiones, 'python': platform.python_version()}}
+        for nombre, comando in comandos.items():
+            latencias = []
+            for _ in range(argumentos.repeticiones):
+                inicio = time.perf_counter()
+                proceso = subprocess.run(comando, cwd=directorio_repo, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                latencias.append(time.perf_counter() - inicio)
+            resultado[nombre] = resumir(latencias)
+            resultado[nombre]['codigo_salida'] = proceso.returncode
+    return resultado
+
+def benchmark_crud(argumentos):
+    resultado = {
+        'parametros': {
+            'operaciones': argumentos.operaciones,
+            'proporcion_completo': argumentos.proporcion_completo,
+            'semilla': argumentos.semilla,
+            'con_cache': argumentos.con_cache,
+            'backend': BackendSQLite.nombre,
+            'python': platform.python_version()
+        },
+        'corridas': []
+    }
+    with tempfile.TemporaryDirectory() as directorio:
+        for tamano in argumentos.tamanos:
+            resultado['corridas'].append(correr(tamano, argumentos.operaciones, argumentos.proporcion_completo,
+                                                argumentos.semilla, directorio, argumentos.con_cache))
+    return resultado
+
+def parsear_argumentos(argumentos=None):
+    parser = argparse.ArgumentParser(description='Benchmarks de la gestión de colaboradores')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--salida', help='Archivo JSON de salida (por defecto se imprime)')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    crud = subparsers.add_parser('crud', help='Throughput y latencias de las operaciones CRUD')
+    crud.add_argument('--tamanos', type=int, nargs='+', default=[1_000, 100_000, 1_000_000],
+                      help='Cantidad de colaboradores cargados en cada corrida')
+    crud.add_argument('--operaciones', type=int, default=1_000, help='Operaciones medidas por tipo')
+    crud.add_argument('--proporcion-completo', type=float, default=0.7,
+                      help='Fracción de colaboradores de tiempo completo (el resto es de tiempo parcial)')
+    crud.add_argument('--con-cache', action='store_true', help='Medir con el cache de lecturas activado')
+    crud.set_defaults(funcion=benchmark_crud)
+
+    memoria = subparsers.add_parser('memoria', help='Memoria por objeto y costo de acceso a atributos')
+    memoria.add_argument('--instancias', type=int, default=1_000_000)
+    memoria.set_defaults(funcion=benchmark_memoria)
+
+    prefijos = subparsers.add_parser('prefijos', help='Búsquedas por prefijo de apellido')
+    prefijos.add_argument('--filas', type=int, default=1_000_000)
+    prefijos.add_argument('--consultas', type=int, default=10_000)
+    prefijos.add_argument('--limite', type=int, default=50, help='Resultados por página')
+    prefijos.add_argument('--bbdd', action='store_true', help='Medir también buscar_colaboradores sobre SQLite')
+    prefijos.set_defaults(funcion=benchmark_prefijos)
+
+    concurrencia = subparsers.add_parser('concurrencia', help='Altas, upserts y bajas simultáneas de los mismos DNI')
+    concurrencia.add_argument('--hilos', type=int, default=16)
+    concurrencia.add_argument('--dnis', type=int, default=50, help='DNI que se disputan los hilos en cada ronda')
+    concurrencia.add_argument('--rondas', type=int, default=20)
+    concurrencia.set_defaults(funcion=benchmark_concurrencia)
+
+    hidratacion = subparsers.add_parser('hidratacion', help='Carga del padrón completo en serie y en paralelo')
+    hidratacion.add_argument('--filas', type=int, default=1_000_000)
+    hidratacion.add_argument('--trabajadores', type=int, nargs='+', default=[1, 2, 4, 8])
+    hidratacion.add_argument('--lote', type=int, default=5_000, help='Filas por fetchmany')
+    hidratacion.add_argument('--recorridos', type=int, default=3)
+    hidratacion.add_argument('--procesos', action='store_true', help='Medir también con un ProcessPoolExecutor')
+    hidratacion.set_defaults(funcion=benchmark_hidratacion)
+
+    listado = subparsers.add_parser('listado', help='Listado completo contra consulta proyectada con proxies')
+    listado.add_argument('--filas', type=int, default=1_000_000)
+    listado.add_argument('--lote', type=int, default=1_000, help='Filas por fetchmany')
+    listado.add_argument('--recorridos', type=int, default=3)
+    listado.set_defaults(funcion=benchmark_listado)
+
+    arranque = subparsers.add_parser('arranque', help='Arranque en frío de main.py en comandos sin BBDD')
+    arranque.add_argument('--repeticiones', type=int, default=30)
+    arranque.set_defaults(funcion=benchmark_arranque)
+
+    return parser.parse_args(argumentos)
+
+if __name__ == '__main__':
+    argumentos = parsear_argumentos()
+    resultado = argumentos.funcion(argumentos)
+
+    salida = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if argumentos.salida:
+        with open(argumentos.salida, 'w', encoding='utf-8') as archivo:
+            archivo.write(salida)
+    else:
+        print(salida)
+    if resultado.get('consistente') is False: ### Para que un CI lo tome como falla
+        sys.exit(1)
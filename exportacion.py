@@ -0,0 +1,87 @@
+'''
+Exportación del padrón completo a archivos (JSON Lines, CSV o columnar)
+
+Las filas se leen de la BBDD en lotes (cursor no buffered + fetchmany), se serializan directamente
+desde las tuplas sin construir objetos Colaborador y cada lote se escribe de una sola vez en un
+archivo con buffer grande. Así la memoria usada no depende del tamaño de la tabla.
+Los campos de cada colaborador son los mismos que devuelve Colaborador.to_dict()
+'''
+
+import csv
+import io
+import json
+import time
+
+FORMATOS = ('jsonl', 'csv', 'columnar')
+COLUMNAS = ('dni', 'nombre', 'apellido', 'edad', 'salario', 'departamento', 'horas_semanales')
+TAMANO_BUFFER = 1 << 20 ### 1 MB
+
+def _normalizar(fila):
+    '''
+    Tupla de CONSULTA_COLABORADORES => valores listos para serializar
+    (igual que en Colaborador: nombres capitalizados, DNI entero y salario float)
+    '''
+    dni, nombre, apellido, edad, salario, departamento, horas_semanales = fila
+    return int(dni), nombre.capitalize(), apellido.capitalize(), edad, float(salario), departamento, horas_semanales
+
+def _lote_jsonl(filas):
+    lineas = []
+    for dni, nombre, apellido, edad, salario, departamento, horas_semanales in map(_normalizar, filas):
+        registro = {'dni': dni, 'nombre': nombre, 'apellido': apellido, 'edad': edad, 'salario': salario}
+        if departamento is not None:
+            registro['departamento'] = departamento
+        elif horas_semanales is not None:
+            registro['horas semanales'] = horas_semanales ### Misma clave que ColaboradorTiempoParcial.to_dict()
+        lineas.append(json.dumps(registro, ensure_ascii=False))
+    lineas.append('')
+    return '\n'.join(lineas)
+
+def _lote_csv(filas):
+    texto = io.StringIO()
+    csv.writer(texto, lineterminator='\n').writerows(map(_normalizar, filas))
+    return texto.getvalue()
+
+def _lote_columnar(filas):
+    '''
+    Cada lote es un "row group" en una línea JSON: una lista de valores por columna
+    '''
+    columnas = zip(*map(_normalizar, filas))
+    return json.dumps({'filas': len(filas), 'columnas': dict(zip(COLUMNAS, map(list, columnas)))}, ensure_ascii=False) + '\n'
+
+SERIALIZADORES = {'jsonl': _lote_jsonl, 'csv': _lote_csv, 'columnar': _lote_columnar}
+
+def exportar_colaboradores(gestion, archivo, formato='jsonl', tamano_lote=10_000):
+    '''
+    Escribe todos los colaboradores en archivo (abierto en modo binario) y devuelve
+    las métricas de la exportación: filas, bytes, segundos, filas/s y MB/s
+    '''
+    if formato not in SERIALIZADORES:
+        raise ValueError(f'Formato no soportado: {formato} (use {", ".join(FORMATOS)})')
+    serializar = SERIALIZADORES[formato]
+
+    inicio = time.perf_counter()
+    filas_totales = bytes_totales = 0
+    if formato == 'csv':
+        encabezado = (','.join(COLUMNAS) + '\n').encode('utf-8')
+        archivo.write(encabezado)
+        bytes_totales += len(encabezado)
+    for filas in gestion._leer_filas(tamano_lote, dictionary=False):
+        datos = serializar(filas).encode('utf-8')
+        archivo.write(datos)
+        filas_totales += len(filas)
+        bytes_totales += len(datos)
+    archivo.flush()
+    segundos = time.perf_counter() - inicio
+
+    return {
+        'formato': formato,
+        'filas': filas_totales,
+        'bytes': bytes_totales,
+        'segundos': segundos,
+        'filas_por_segundo': filas_totales / segundos if segundos else 0.0,
+        'mb_por_segundo': bytes_totales / (1 << 20) / segundos if segundos else 0.0
+    }
+
+def exportar_a_archivo(gestion, ruta, formato='jsonl', tamano_lote=10_000):
+    with open(ruta, 'wb', buffering=TAMANO_BUFFER) as archivo:
+        return exportar_colaboradores(gestion, archivo, formato, tamano_lote)
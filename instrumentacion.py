@@ -0,0 +1,331 @@
+'''
+Instrumentación de GestionColaboradores
+
+Mide cada operación (latencia en un histograma), cuenta las consultas SQL que ejecuta cada
+operación lógica (un patrón N+1 aparece enseguida como muchas consultas por llamada), mide el
+tiempo de espera para obtener una conexión del pool y escribe un log de consultas lentas con
+el texto SQL y los parámetros ocultos. Se activa con METRICS_ENABLED; desactivada no agrega costo
+y activada sólo actualiza contadores en memoria.
+Las métricas se pueden exportar como texto, JSON o en el formato de texto de Prometheus
+'''
+
+import bisect
+import contextvars
+import functools
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+### Límites superiores (en segundos) de los buckets de los histogramas de latencia
+LIMITES_LATENCIA = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIN_OPERACION = '(fuera de operacion)'
+
+CO_GENERATOR = 0x20 ### Igual que inspect.CO_GENERATOR, sin pagar la importación de inspect al arrancar
+_operacion_actual = contextvars.ContextVar('operacion_actual', default=None)
+
+class Histograma:
+    '''
+    Histograma acumulativo de buckets fijos (como los de Prometheus): cantidad, suma y máximo
+    '''
+    __slots__ = ('limites', 'buckets', 'cantidad', 'suma', 'maximo')
+
+    def __init__(self, limites=LIMITES_LATENCIA) -> None:
+        self.limites = limites
+        self.buckets = [0] * (len(limites) + 1) ### El último es +Inf
+        self.cantidad = 0
+        self.suma = 0.0
+        self.maximo = 0.0
+
+    def registrar(self, valor):
+        self.buckets[bisect.bisect_left(self.limites, valor)] += 1
+        self.cantidad += 1
+        self.suma += valor
+        if valor > self.maximo:
+            self.maximo = valor
+
+    def percentil(self, p):
+        '''
+        Estimación del percentil p (0-100): el límite superior del bucket donde cae
+        '''
+        if not self.cantidad:
+            return 0.0
+        objetivo = self.cantidad * p / 100
+        acumulado = 0
+        for limite, cantidad in zip(self.limites + (self.maximo,), self.buckets):
+            acumulado += cantidad
+            if acumulado >= objetivo:
+                return min(limite, self.maximo)
+        return self.maximo
+
+    def to_dict(self):
+        return {
+            'cantidad': self.cantidad,
+            'suma': self.suma,
+            'promedio': self.suma / self.cantidad if self.cantidad else 0.0,
+            'maximo': self.maximo,
+            'p50': self.percentil(50),
+            'p95': self.percentil(95),
+            'p99': self.percentil(99),
+            'buckets': dict(zip([str(limite) for limite in self.limites] + ['+Inf'], self.buckets))
+        }
+
+class Metricas:
+    '''
+    Registro de métricas de una instancia de GestionColaboradores (thread-safe)
+    '''
+    def __init__(self, umbral_lento=0.1, log_lentas=None) -> None:
+        self.umbral_lento = umbral_lento ### Segundos a partir de los cuales una consulta se considera lenta
+        self.log_lentas = log_lentas ### Archivo (JSON Lines) del log de consultas lentas, None para no escribirlo
+        self.__lock = threading.Lock()
+        self.__latencias = {} ### operación -> Histograma
+        self.__consultas = {} ### operación -> total de consultas ejecutadas
+        self.__consultas_por_llamada = {} ### operación -> máximo de consultas en una sola llamada
+        self.__espera_conexion = Histograma()
+        self.__consultas_lentas = 0
+
+    @contextmanager
+    def operacion(self, nombre):
+        '''
+        Mide una operación lógica y le atribuye las consultas que se ejecuten dentro
+        '''
+        contador = [0]
+        token = _operacion_actual.set((nombre, contador))
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.__cerrar_operacion(nombre, contador[0], time.perf_counter() - inicio)
+            _operacion_actual.reset(token)
+
+    def medir_generador(self, nombre, generador):
+        '''
+        Como operacion(), para los métodos que son generadores: sólo se cuenta el tiempo
+        que pasa dentro del generador, no el que usa quien lo está recorriendo
+        '''
+        contador = [0]
+        duracion = 0.0
+        try:
+            while True:
+                token = _operacion_actual.set((nombre, contador))
+                inicio = time.perf_counter()
+                try:
+                    elemento = next(generador)
+                except StopIteration:
+                    return
+                finally:
+                    duracion += time.perf_counter() - inicio
+                    _operacion_actual.reset(token)
+                yield elemento
+        finally:
+            generador.close()
+            self.__cerrar_operacion(nombre, contador[0], duracion)
+
+    @contextmanager
+    def atribuir(self, nombre):
+        '''
+        Suma a la operación "nombre" las consultas que se ejecuten dentro, sin contarlas como otra llamada
+        (por ej. las cargas diferidas de los proxies de un listado, que ocurren fuera del generador)
+        '''
+        contador = [0]
+        token = _operacion_actual.set((nombre, contador))
+        try:
+            yield
+        finally:
+            _operacion_actual.reset(token)
+            with self.__lock:
+                self.__consultas[nombre] = self.__consultas.get(nombre, 0) + contador[0]
+
+    def __cerrar_operacion(self, nombre, consultas, duracion):
+        with self.__lock:
+            histograma = self.__latencias.get(nombre)
+            if histograma is None:
+                histograma = self.__latencias[nombre] = Histograma()
+            histograma.registrar(duracion)
+            self.__consultas[nombre] = self.__consultas.get(nombre, 0) + consultas
+            if consultas > self.__consultas_por_llamada.get(nombre, 0):
+                self.__consultas_por_llamada[nombre] = consultas
+
+    def registrar_consulta(self, sql, params, duracion):
+        actual = _operacion_actual.get()
+        if actual is None:
+            with self.__lock:
+                self.__consultas[SIN_OPERACION] = self.__consultas.get(SIN_OPERACION, 0) + 1
+        else:
+            actual[1][0] += 1 ### Sólo lo usa el hilo que ejecuta la operación
+        if duracion >= self.umbral_lento:
+            self.__registrar_lenta(actual[0] if actual else SIN_OPERACION, sql, params, duracion)
+
+    def registrar_espera_conexion(self, duracion):
+        with self.__lock:
+            self.__espera_conexion.registrar(duracion)
+
+    def __registrar_lenta(self, operacion, sql, params, duracion):
+        with self.__lock:
+            self.__consultas_lentas += 1
+            if not self.log_lentas:
+                return
+            entrada = {
+                'fecha': datetime.now().isoformat(timespec='milliseconds'),
+                'operacion': operacion,
+                'ms': round(duracion * 1000, 3),
+                'sql': re.sub(r'\s+', ' ', sql).strip(),
+                'parametros': redactar(params) ### Nunca se escriben los valores (DNI, salarios...)
+            }
+            with open(self.log_lentas, 'a', encoding='utf-8') as archivo:
+                archivo.write(json.dumps(entrada, ensure_ascii=False) + '\n')
+
+    def snapshot(self):
+        with self.__lock:
+            return {
+                'operaciones': {
+                    nombre: {
+                        'latencia': histograma.to_dict(),
+                        'consultas': self.__consultas.get(nombre, 0),
+                        'consultas_por_llamada': self.__consultas.get(nombre, 0) / histograma.cantidad if histograma.cantidad else 0.0,
+                        'max_consultas_por_llamada': self.__consultas_por_llamada.get(nombre, 0)
+                    }
+                    for nombre, histograma in self.__latencias.items()
+                },
+                'consultas_fuera_de_operacion': self.__consultas.get(SIN_OPERACION, 0),
+                'espera_conexion': self.__espera_conexion.to_dict(),
+                'consultas_lentas': self.__consultas_lentas
+            }
+
+    def exportar(self, formato='json', extras=None):
+        '''
+        formato: 'json', 'texto' o 'prometheus'. extras son valores adicionales
+        (por ej. las estadísticas del pool y del cache) que se agregan como gauges
+        '''
+        datos = self.snapshot()
+        extras = extras or {}
+        if formato == 'json':
+            return json.dumps({**datos, **extras}, indent=2, ensure_ascii=False)
+        if formato == 'texto':
+            return _formato_texto(datos, extras)
+        if formato == 'prometheus':
+            return _formato_prometheus(datos, extras)
+        raise ValueError(f'Formato de métricas no soportado: {formato} (use json, texto o prometheus)')
+
+def redactar(params):
+    if params is None:
+        return []
+    if isinstance(params, dict):
+        return {clave: '?' for clave in params}
+    return ['?'] * len(params)
+
+def _formato_texto(datos, extras):
+    lineas = [f'{"operacion":<30} {"llamadas":>9} {"prom ms":>9} {"p95 ms":>9} {"max ms":>9} {"consultas/llamada":>18}']
+    for nombre, operacion in sorted(datos['operaciones'].items()):
+        latencia = operacion['latencia']
+        lineas.append(f'{nombre:<30} {latencia["cantidad"]:>9} {latencia["promedio"] * 1000:>9.3f} '
+                      f'{latencia["p95"] * 1000:>9.3f} {latencia["maximo"] * 1000:>9.3f} {operacion["consultas_por_llamada"]:>18.2f}')
+    espera = datos['espera_conexion']
+    lineas.append(f'Espera de conexión: {espera["cantidad"]} préstamos, promedio {espera["promedio"] * 1000:.3f} ms, '
+                  f'máximo {espera["maximo"] * 1000:.3f} ms')
+    lineas.append(f'Consultas lentas: {datos["consultas_lentas"]}')
+    lineas.append(f'Consultas fuera de una operación: {datos["consultas_fuera_de_operacion"]}')
+    for grupo, valores in extras.items():
+        lineas.append(f'{grupo}: ' + ', '.join(f'{clave}={valor}' for clave, valor in valores.items()))
+    return '\n'.join(lineas) + '\n'
+
+def _histograma_prometheus(lineas, metrica, etiquetas, histograma):
+    acumulado = 0
+    for limite, cantidad in histograma['buckets'].items():
+        acumulado += cantidad
+        lineas.append(f'{metrica}_bucket{{{etiquetas}le="{limite}"}} {acumulado}')
+    lineas.append(f'{metrica}_sum{{{etiquetas.rstrip(",")}}} {histograma["suma"]}')
+    lineas.append(f'{metrica}_count{{{etiquetas.rstrip(",")}}} {histograma["cantidad"]}')
+
+def _formato_prometheus(datos, extras):
+    lineas = ['# HELP colaboradores_operacion_segundos Latencia de cada operacion de GestionColaboradores',
+              '# TYPE colaboradores_operacion_segundos histogram']
+    for nombre, operacion in sorted(datos['operaciones'].items()):
+        _histograma_prometheus(lineas, 'colaboradores_operacion_segundos', f'operacion="{nombre}",', operacion['latencia'])
+    lineas += ['# HELP colaboradores_consultas_total Consultas SQL ejecutadas por operacion',
+               '# TYPE colaboradores_consultas_total counter']
+    for nombre, operacion in sorted(datos['operaciones'].items()):
+        lineas.append(f'colaboradores_consultas_total{{operacion="{nombre}"}} {operacion["consultas"]}')
+    lineas.append(f'colaboradores_consultas_total{{operacion="{SIN_OPERACION}"}} {datos["consultas_fuera_de_operacion"]}')
+    lineas += ['# HELP colaboradores_max_consultas_por_llamada Maximo de consultas SQL en una sola llamada',
+               '# TYPE colaboradores_max_consultas_por_llamada gauge']
+    for nombre, operacion in sorted(datos['operaciones'].items()):
+        lineas.append(f'colaboradores_max_consultas_por_llamada{{operacion="{nombre}"}} {operacion["max_consultas_por_llamada"]}')
+    lineas += ['# HELP colaboradores_espera_conexion_segundos Tiempo para obtener una conexion del pool',
+               '# TYPE colaboradores_espera_conexion_segundos histogram']
+    _histograma_prometheus(lineas, 'colaboradores_espera_conexion_segundos', '', datos['espera_conexion'])
+    lineas += ['# HELP colaboradores_consultas_lentas_total Consultas que superaron el umbral de consulta lenta',
+               '# TYPE colaboradores_consultas_lentas_total counter',
+               f'colaboradores_consultas_lentas_total {datos["consultas_lentas"]}']
+    for grupo, valores in extras.items():
+        for clave, valor in valores.items():
+            if isinstance(valor, (int, float)):
+                lineas.append(f'# TYPE colaboradores_{grupo}_{clave} gauge')
+                lineas.append(f'colaboradores_{grupo}_{clave} {valor}')
+    return '\n'.join(lineas) + '\n'
+
+class CursorInstrumentado:
+    '''
+    Envuelve un cursor para medir cada execute/executemany; el resto se delega al cursor original
+    '''
+    def __init__(self, cursor, metricas) -> None:
+        self.__cursor = cursor
+        self.__metricas = metricas
+
+    def execute(self, sql, params=()):
+        inicio = time.perf_counter()
+        try:
+            return self.__cursor.execute(sql, params)
+        finally:
+            self.__metricas.registrar_consulta(sql, params, time.perf_counter() - inicio)
+
+    def executemany(self, sql, lista_params):
+        inicio = time.perf_counter()
+        try:
+            return self.__cursor.executemany(sql, lista_params)
+        finally:
+            self.__metricas.registrar_consulta(sql, None, time.perf_counter() - inicio)
+
+    def __getattr__(self, nombre):
+        return getattr(self.__cursor, nombre)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.__cursor.close()
+
+class ConexionInstrumentada:
+    '''
+    Envuelve una conexión para que sus cursores estén instrumentados
+    '''
+    def __init__(self, connection, metricas) -> None:
+        self.__connection = connection
+        self.__metricas = metricas
+
+    def cursor(self, *args, **kwargs):
+        return CursorInstrumentado(self.__connection.cursor(*args, **kwargs), self.__metricas)
+
+    def __getattr__(self, nombre):
+        return getattr(self.__connection, nombre)
+
+def instrumentado(metodo):
+    '''
+    Decorador para los métodos de GestionColaboradores: si self.metricas es None
+    (instrumentación desactivada) llama al método directamente
+    '''
+    nombre = metodo.__name__
+    es_generador = bool(metodo.__code__.co_flags & CO_GENERATOR)
+
+    @functools.wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        if self.metricas is None:
+            return metodo(self, *args, **kwargs)
+        if es_generador:
+            return self.metricas.medir_generador(nombre, metodo(self, *args, **kwargs))
+        with self.metricas.operacion(nombre):
+            return metodo(self, *args, **kwargs)
+
+    return envoltura
@@ -2,15 +2,30 @@
 Mientras que en main implementamos los métodos, en el otro archivo tenemos las clases y los mencionados métodos
 '''
 
+import time
+INICIO_IMPORTS = time.perf_counter() ### Para --profile-startup
+
+import argparse
+import atexit
+import contextlib
+import csv
+import json
 import os
 import platform
+import sys
 
+from exportacion import FORMATOS, exportar_a_archivo, exportar_colaboradores
 from poo import (
     ColaboradorTiempoCompleto,
     ColaboradorTiempoParcial,
-    GestionColaboradores
+    GestionColaboradores,
+    RegistroInvalido
 )
 
+TIEMPO_IMPORTS = time.perf_counter() - INICIO_IMPORTS
+### Módulos pesados que sólo deberían cargarse si el comando los usa
+MODULOS_DIFERIDOS = ('mysql.connector', 'decouple', 'sqlite3', 'asyncio', 'concurrent.futures')
+
 def limpiar_pantalla():
     '''
     Limpiar la pantalla según OS
@@ -84,7 +99,7 @@ def eliminar_colaborador_por_dni(gestion: GestionColaboradores):
 def mostrar_todos_los_colaboradores(gestion: GestionColaboradores):
     print('=============== Listado completo de los  Colaboradores ==============')
     try:
-        colaboradores = gestion.leer_todos_los_colaboradores()
+        colaboradores = gestion.leer_todos_los_colaboradores(columnas=('apellido',)) ### Sólo lo que se muestra
         for colaborador in colaboradores:
             if isinstance(colaborador, ColaboradorTiempoCompleto):
                 print(f'{colaborador.dni} {colaborador.apellido} {colaborador.departamento}')
@@ -97,12 +112,270 @@ def mostrar_todos_los_colaboradores(gestion: GestionColaboradores):
     print('=====================================================================')
     input('Presione enter para continuar...')
 
+def leer_registros(ruta):
+    '''
+    Generador que lee el archivo de importación registro por registro (sin cargarlo entero en memoria)
+    Formatos: .csv (con encabezado), .jsonl (un objeto JSON por línea) o .json (lista de objetos)
+    En .jsonl una línea mal formada se entrega como RegistroInvalido, para que se informe como rechazada
+    '''
+    extension = os.path.splitext(ruta)[1].lower()
+    with open(ruta, encoding='utf-8', newline='') as archivo:
+        if extension == '.csv':
+            yield from csv.DictReader(archivo)
+        elif extension in ('.jsonl', '.ndjson'):
+            for numero_linea, linea in enumerate(archivo, start=1):
+                if linea.strip():
+                    try:
+                        registro = json.loads(linea)
+                    except ValueError as e:
+                        registro = RegistroInvalido(f'JSON inválido en la línea {numero_linea}: {e}')
+                    yield registro
+        elif extension == '.json':
+            yield from json.load(archivo) ### Un arreglo JSON no se puede leer por partes sin dependencias extra
+        else:
+            raise ValueError(f'Formato de archivo no soportado: {extension} (use .csv, .jsonl o .json)')
+
+def importar_colaboradores(gestion: GestionColaboradores, ruta, tamano_lote=None):
+    '''
+    Importación no interactiva: python main.py import <archivo> [--lote N]
+    '''
+    try:
+        reporte = gestion.crear_colaboradores_bulk(leer_registros(ruta), tamano_lote)
+    except (OSError, ValueError) as e:
+        print(f'Error al leer el archivo {ruta}: {e}')
+        return 1
+
+    print(f'Colaboradores importados: {reporte["insertados"]}')
+    print(f'Registros rechazados: {len(reporte["rechazados"])}')
+    for rechazo in reporte['rechazados']:
+        print(f'  registro {rechazo["registro"]} (DNI {rechazo["dni"]}): {rechazo["motivo"]}')
+    return 0
+
+def validar_archivo(gestion: GestionColaboradores, ruta):
+    '''
+    Validación sin tocar la BBDD: python main.py import <archivo> --validar
+    Revisa cada registro con las mismas reglas que la importación (incluidos los DNI repetidos en el archivo)
+    '''
+    validos = set()
+    rechazados = []
+    try:
+        for numero, registro in enumerate(leer_registros(ruta), start=1):
+            try:
+                colaborador = gestion._colaborador_desde_registro(registro)
+            except (ValueError, TypeError) as e:
+                rechazados.append((numero, gestion._dni_de_registro(registro), str(e)))
+                continue
+            if colaborador.dni in validos:
+                rechazados.append((numero, colaborador.dni, 'DNI duplicado en el archivo'))
+                continue
+            validos.add(colaborador.dni)
+    except (OSError, ValueError) as e:
+        print(f'Error al leer el archivo {ruta}: {e}')
+        return 1
+
+    print(f'Registros válidos: {len(validos)}')
+    print(f'Registros rechazados: {len(rechazados)}')
+    for numero, dni, motivo in rechazados:
+        print(f'  registro {numero} (DNI {dni}): {motivo}')
+    return 1 if rechazados else 0
+
+def reportar_arranque(tiempos, inicio_comando=None):
+    '''
+    --profile-startup: tiempos de arranque (en ms) y qué módulos pesados se llegaron a cargar, en stderr
+    '''
+    if inicio_comando is not None:
+        tiempos['comando'] = time.perf_counter() - inicio_comando
+    print('Perfil de arranque (ms):', file=sys.stderr)
+    for etapa, segundos in tiempos.items():
+        print(f'  {etapa:<28}{segundos * 1000:>10.2f}', file=sys.stderr)
+    print('Módulos diferidos cargados:', file=sys.stderr)
+    for modulo in MODULOS_DIFERIDOS:
+        print(f'  {modulo:<28}{"sí" if modulo in sys.modules else "no":>10}', file=sys.stderr)
+
+def exportar(gestion: GestionColaboradores, formato, ruta=None, tamano_lote=10_000):
+    '''
+    Exportación no interactiva: python main.py export --format jsonl|csv|columnar [--salida archivo]
+    Sin --salida se escribe en la salida estándar y las métricas van a stderr
+    '''
+    try:
+        if ruta:
+            metricas = exportar_a_archivo(gestion, ruta, formato, tamano_lote)
+        else:
+            metricas = exportar_colaboradores(gestion, sys.stdout.buffer, formato, tamano_lote)
+    except Exception as e:
+        print(f'Error al exportar los colaboradores: {e}', file=sys.stderr)
+        return 1
+
+    print(f'Exportados {metricas["filas"]} colaboradores ({metricas["bytes"] / (1 << 20):.2f} MB) '
+          f'en {metricas["segundos"]:.2f} s: {metricas["filas_por_segundo"]:.0f} filas/s, '
+          f'{metricas["mb_por_segundo"]:.2f} MB/s', file=sys.stderr if not ruta else sys.stdout)
+    return 0
+
+CAMPOS_BATCH = ('op', 'dni', 'nombre', 'apellido', 'edad', 'salario', 'departamento', 'horas_semanales')
+ESCRITURAS = ('create', 'upsert', 'update', 'delete')
+
+def leer_comandos(archivo):
+    '''
+    Generador de (número de línea, comando) para el modo batch. Cada línea es un objeto JSON
+    ({"op": "create", "dni": ...}) o una línea CSV con los campos en el orden de CAMPOS_BATCH:
+        create,12345678,Ana,Pérez,30,1500,Ventas
+        upsert,12345678,Ana,Pérez,31,1600,Ventas      (crea o reemplaza)
+        create,23456789,Juan,Gómez,25,800,,20
+        read,12345678
+        update,12345678,1800      (para update el tercer campo es el salario)
+        delete,12345678
+        list
+    Las líneas vacías y las que empiezan con # se ignoran
+    '''
+    for numero, linea in enumerate(archivo, start=1):
+        linea = linea.strip()
+        if not linea or linea.startswith('#'):
+            continue
+        try:
+            if linea.startswith('{'):
+                comando = json.loads(linea)
+            else:
+                valores = next(csv.reader([linea]))
+                if valores[0].strip().lower() == 'update':
+                    comando = dict(zip(('op', 'dni', 'salario'), valores))
+                else:
+                    comando = dict(zip(CAMPOS_BATCH, valores))
+            comando['op'] = str(comando.get('op', '')).strip().lower()
+        except (ValueError, IndexError) as e:
+            comando = {'op': None, 'error': f'Línea inválida: {e}'}
+        yield numero, comando
+
+def ejecutar_comando(gestion: GestionColaboradores, comando):
+    '''
+    Ejecuta un comando del modo batch y devuelve su resultado como diccionario
+    '''
+    op = comando['op']
+    if op == 'create':
+        colaborador = gestion._colaborador_desde_registro({campo: valor for campo, valor in comando.items() if campo != 'op'})
+        return {'ok': gestion.crear_colaborador(colaborador)}
+    if op == 'upsert':
+        colaborador = gestion._colaborador_desde_registro({campo: valor for campo, valor in comando.items() if campo != 'op'})
+        return {'ok': gestion.upsert_colaborador(colaborador)}
+    if op == 'read':
+        ### Sin los métodos que atrapan los errores: un fallo de la BBDD tiene que llegar como ok = false, no como "no existe"
+        colaborador = gestion._buscar_colaborador(comando['dni'])
+        return {'ok': True, 'colaborador': colaborador.to_dict() if colaborador else None}
+    if op == 'update':
+        return {'ok': gestion.actualizar_colaborador(comando['dni'], float(comando['salario']))}
+    if op == 'delete':
+        return {'ok': gestion.eliminar_colaborador(comando['dni'])}
+    if op == 'list':
+        return {'ok': True, 'colaboradores': [colaborador.to_dict() for lote in gestion._leer_lotes() for colaborador in lote]}
+    raise ValueError(comando.get('error') or f'Operación desconocida: {op}')
+
+def ejecutar_batch(gestion: GestionColaboradores, archivo, salida, tamano_transaccion=100):
+    '''
+    Modo batch: python main.py batch [archivo|-] [--transaccion N]
+    Ejecuta los comandos con una sola instancia de GestionColaboradores. Las escrituras consecutivas
+    (hasta N) se agrupan en una transacción y una lectura o un listado cierra el grupo antes de
+    ejecutarse, así siempre ve lo escrito por los comandos anteriores.
+    Por cada comando se escribe en salida una línea JSON {"linea", "op", "dni", "ok", ...}; los de un
+    grupo se escriben recién cuando se confirma (si el commit falla todos quedan con ok = false).
+    Los mensajes de GestionColaboradores van a stderr. Devuelve 1 si algún comando falló
+    '''
+    grupo = []
+    fallidos = 0
+
+    def escribir(resultados):
+        nonlocal fallidos
+        for resultado in resultados:
+            fallidos += not resultado['ok']
+            salida.write(json.dumps(resultado, ensure_ascii=False) + '\n')
+        salida.flush()
+
+    def ejecutar(numero, comando):
+        resultado = {'linea': numero, 'op': comando['op'], 'dni': comando.get('dni')}
+        try:
+            resultado.update(ejecutar_comando(gestion, comando))
+        except Exception as e:
+            resultado.update(ok=False, error=str(e))
+        return resultado
+
+    def confirmar_grupo():
+        if not grupo:
+            return
+        resultados = []
+        try:
+            with gestion.transaccion():
+                for numero, comando in grupo:
+                    resultados.append(ejecutar(numero, comando))
+        except Exception as e:
+            resultados = [{'linea': numero, 'op': comando['op'], 'dni': comando.get('dni'),
+                           'ok': False, 'error': f'Error al confirmar la transacción: {e}'} for numero, comando in grupo]
+        grupo.clear()
+        escribir(resultados)
+
+    with contextlib.redirect_stdout(sys.stderr): ### La salida estándar queda sólo para los resultados
+        for numero, comando in leer_comandos(archivo):
+            if comando['op'] in ESCRITURAS:
+                grupo.append((numero, comando))
+                if len(grupo) >= tamano_transaccion:
+                    confirmar_grupo()
+            else:
+                confirmar_grupo()
+                escribir([ejecutar(numero, comando)])
+        confirmar_grupo()
+    return 1 if fallidos else 0
+
+def parsear_argumentos(argumentos=None):
+    '''
+    Sin argumentos se abre el menú interactivo
+    '''
+    parser = argparse.ArgumentParser(description='Gestión de colaboradores')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='Informar en stderr los tiempos de importación, inicialización y del comando')
+    subparsers = parser.add_subparsers(dest='comando')
+
+    importar = subparsers.add_parser('import', help='Importar colaboradores desde un archivo CSV/JSON')
+    importar.add_argument('archivo', help='Ruta del archivo .csv, .jsonl o .json')
+    importar.add_argument('--lote', type=int, default=None, help='Cantidad de registros por transacción (por defecto DB_BATCH_SIZE)')
+    importar.add_argument('--validar', action='store_true', help='Sólo validar el archivo, sin conectarse a la BBDD')
+
+    exportacion = subparsers.add_parser('export', help='Exportar todos los colaboradores a un archivo')
+    exportacion.add_argument('--format', dest='formato', choices=FORMATOS, default='jsonl')
+    exportacion.add_argument('--salida', help='Archivo de salida (por defecto la salida estándar)')
+    exportacion.add_argument('--lote', type=int, default=10_000, help='Filas leídas y escritas por lote')
+
+    batch = subparsers.add_parser('batch', help='Ejecutar comandos (create/upsert/read/update/delete/list) desde un archivo o stdin')
+    batch.add_argument('archivo', nargs='?', default='-', help='Archivo con un comando JSON o CSV por línea (- o nada = stdin)')
+    batch.add_argument('--transaccion', type=int, default=100, help='Máximo de escrituras consecutivas por transacción')
+
+    return parser.parse_args(argumentos)
+
 '''
 Cuando 'detecta' que se está ejecutando este archivo, 
 corre esta porción de código:
 '''
 if __name__ == '__main__':
-    gestion_colaboradores = GestionColaboradores() ### Instancia de la clase que implementa el CRUD
+    tiempos = {'imports': TIEMPO_IMPORTS}
+    inicio = time.perf_counter()
+    argumentos = parsear_argumentos()
+    tiempos['argumentos'] = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    gestion_colaboradores = GestionColaboradores() ### Instancia de la clase que implementa el CRUD (no se conecta hasta usarla)
+    tiempos['GestionColaboradores()'] = time.perf_counter() - inicio
+    if argumentos.profile_startup and argumentos.comando:
+        atexit.register(reportar_arranque, tiempos, time.perf_counter())
+
+    if argumentos.comando == 'import' and argumentos.validar:
+        sys.exit(validar_archivo(gestion_colaboradores, argumentos.archivo))
+    if argumentos.comando == 'import':
+        sys.exit(importar_colaboradores(gestion_colaboradores, argumentos.archivo, argumentos.lote))
+    if argumentos.comando == 'export':
+        sys.exit(exportar(gestion_colaboradores, argumentos.formato, argumentos.salida, argumentos.lote))
+    if argumentos.comando == 'batch':
+        if argumentos.archivo == '-':
+            sys.exit(ejecutar_batch(gestion_colaboradores, sys.stdin, sys.stdout, argumentos.transaccion))
+        with open(argumentos.archivo, encoding='utf-8') as archivo:
+            sys.exit(ejecutar_batch(gestion_colaboradores, archivo, sys.stdout, argumentos.transaccion))
+    if argumentos.profile_startup:
+        reportar_arranque(tiempos)
+        input('Presione enter para continuar...')
 
     while True:
         limpiar_pantalla()
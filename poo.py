@@ -10,9 +10,36 @@ Requisitos:
 '''
 
 #Imports necesarios
-import mysql.connector
-from mysql.connector import Error
-from decouple import config
+### El driver de MySQL, python-decouple, sqlite3, asyncio y concurrent.futures se importan recién
+### cuando se usan: así los comandos que no tocan la BBDD (ayuda, validar un archivo) arrancan rápido
+import bisect
+import contextvars
+import functools
+import itertools
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+
+from instrumentacion import ConexionInstrumentada, Metricas, instrumentado
+
+def config(*args, **kwargs):
+    '''
+    Lee una variable del .env (o del entorno) con python-decouple, que se importa en la primera lectura
+    '''
+    from decouple import config as leer_config
+    return leer_config(*args, **kwargs)
+
+def importar_mysql():
+    '''
+    Importa el driver de MySQL la primera vez que hace falta (tarda decenas de milisegundos)
+    '''
+    import mysql.connector
+    return mysql.connector
 
 
 #Clase base
@@ -26,11 +53,17 @@ class Colaborador:
     Esto lo hacemos mediante @Property para convertir en propiedad los atributos y modificamos los datos de manera
     controlada con los setters 
 
+    Con __slots__ cada instancia guarda sus atributos en lugares fijos en vez de un __dict__,
+    lo que reduce bastante la memoria cuando se cargan muchos colaboradores a la vez
     '''
+    __slots__ = ('__dni', '__nombre', '__apellido', '__edad', '__salario')
+
     def __init__(self, dni, nombre, apellido, edad, salario) -> None:
         self.__dni = self.validar_dni(dni)
-        self.__nombre = nombre
-        self.__apellido = apellido
+        ### Se normaliza una sola vez al crear el objeto y no en cada acceso. Con intern los nombres
+        ### repetidos (muy comunes en un padrón grande) comparten una única cadena en memoria
+        self.__nombre = self.validar_nombre(nombre, 'nombre')
+        self.__apellido = self.validar_nombre(apellido, 'apellido')
         self.__edad = edad
         self.__salario = self.validar_salario(salario) ### Caso instanciación o creación de objeto
     
@@ -47,11 +80,11 @@ class Colaborador:
     
     @property
     def nombre(self):
-        return self.__nombre.capitalize() ###En este caso ya se aplicó una modificación
+        return self.__nombre ###Ya se guardó con la modificación (capitalize) en el constructor
     
     @property
     def apellido(self):
-        return self.__apellido.capitalize()
+        return self.__apellido
     
     @property
     def edad(self):
@@ -75,7 +108,9 @@ class Colaborador:
     def dni(self, dni_num):
         self.__dni = self.validar_dni(dni_num)
 
-    def validar_salario(self, salario):
+    ### Las validaciones no dependen de la instancia: se pueden usar sin crear un colaborador, por ej. Colaborador.validar_salario(x)
+    @staticmethod
+    def validar_salario(salario):
         try:
             salario_num = float(salario)
             if salario_num < 0: 
@@ -84,7 +119,14 @@ class Colaborador:
         except ValueError:
             raise ValueError('El salario debe ser un número válido')
     
-    def validar_dni(self, dni):
+    @staticmethod
+    def validar_nombre(nombre, campo='nombre'):
+        if not isinstance(nombre, str):
+            raise TypeError(f'El {campo} debe ser texto, no {type(nombre).__name__}')
+        return sys.intern(nombre.capitalize())
+
+    @staticmethod
+    def validar_dni(dni):
         try:
             dni_num = int(dni)
             if len(str(dni)) not in [7, 8]:
@@ -118,6 +160,8 @@ class ColaboradorTiempoCompleto(Colaborador):
     Herencia: llamamos al método __init__ de la clase base o superclase Colaborador y la instanciamos 
     con los valores que recibimos en la subclase ColaboradorTiempoCompleto (el atributo diferenciador es departamento)
     '''
+    __slots__ = ('__departamento',)
+
     def __init__(self, dni, nombre, apellido, edad, salario, departamento) -> None:
         super().__init__(dni, nombre, apellido, edad, salario) 
         self.__departamento = departamento
@@ -141,6 +185,8 @@ class ColaboradorTiempoCompleto(Colaborador):
         return f'{super().__str__()}' + f' departamento: {self.departamento}' ### Devuelve el str de la clase base y se le agrega el departamento.
     
 class ColaboradorTiempoParcial(Colaborador):
+    __slots__ = ('__horas_semanales',)
+
     def __init__(self, dni, nombre, apellido, edad, salario, horas_semanales) -> None:
         super().__init__(dni, nombre, apellido, edad, salario)
         self.__horas_semanales = horas_semanales
@@ -157,213 +203,1890 @@ class ColaboradorTiempoParcial(Colaborador):
     def __str__(self) -> str:
         return f'{super().__str__()} + horas semanales: {self.horas_semanales}' 
 
+#Proxies con carga diferida
+### Atributos de Colaborador que se pueden dejar sin traer en una consulta proyectada, con el slot donde se guardan
+ATRIBUTOS_DIFERIBLES = {
+    'nombre': '_Colaborador__nombre',
+    'apellido': '_Colaborador__apellido',
+    'edad': '_Colaborador__edad',
+    'salario': '_Colaborador__salario'
+}
+
+class CargaDiferida:
+    '''
+    Atributos pendientes de los proxies de un lote de una consulta proyectada. Cada proxy anota su DNI al crearse
+    y, cuando uno necesita un atributo que no se trajo, se traen los de todos los pendientes juntos
+    (con consultas de hasta 1000 DNI); cada proxy toma los suyos la primera vez que los usa.
+    Las consultas se atribuyen en las métricas a la operación que creó los proxies
+    '''
+    TAMANO_CONSULTA = 1000
+
+    def __init__(self, gestion, faltantes, operacion) -> None:
+        self.gestion = gestion
+        self.faltantes = tuple(faltantes)
+        self.operacion = operacion
+        self.pendientes = [] ### DNIs de los proxies creados desde la última carga
+        self.consultas = 0
+        self.__valores = {}
+        self.__lock = threading.Lock()
+
+    def completar(self, colaborador):
+        with self.__lock:
+            if colaborador._carga is not self: ### Otro hilo ya lo completó
+                return
+            if colaborador.dni not in self.__valores and self.pendientes:
+                self.__cargar()
+            valores = self.__valores.pop(colaborador.dni, None)
+        if valores is None: ### Se eliminó de la BBDD después de la consulta proyectada
+            colaborador._carga = False
+        else:
+            colaborador._completar(zip(self.faltantes, valores))
+
+    def __cargar(self):
+        dnis, self.pendientes = self.pendientes, []
+        columnas = ', '.join(self.faltantes)
+        metricas = self.gestion.metricas
+        with metricas.atribuir(self.operacion) if metricas is not None else nullcontext(), \
+                self.gestion._conexion() as connection:
+            with connection.cursor() as cursor:
+                for inicio in range(0, len(dnis), self.TAMANO_CONSULTA):
+                    parte = dnis[inicio:inicio + self.TAMANO_CONSULTA]
+                    marcadores = ', '.join(['%s'] * len(parte))
+                    cursor.execute(f'SELECT dni, {columnas} FROM colaboradores WHERE dni IN ({marcadores})', parte)
+                    self.consultas += 1
+                    for dni, *valores in cursor.fetchall():
+                        self.__valores[dni] = valores
+
+class ColaboradorDiferido:
+    '''
+    Mixin de los proxies que devuelve leer_todos_los_colaboradores(columnas=...): son instancias de las
+    subclases de siempre (isinstance, to_dict y las propiedades funcionan igual) pero sólo traen dni,
+    el subtipo y las columnas pedidas. El resto se carga en lote la primera vez que se accede.
+    Los datos vienen de la BBDD, donde ya se validaron al guardarse, así que no se vuelven a validar
+    '''
+    __slots__ = ()
+    _ATRIBUTO_SUBTIPO = None ### Slot del dato propio del subtipo (departamento u horas semanales)
+
+    @classmethod
+    def _crear(cls, carga, dni, valores, subtipo=None):
+        colaborador = cls.__new__(cls)
+        colaborador._Colaborador__dni = dni = int(dni)
+        colaborador._completar(valores)
+        if cls._ATRIBUTO_SUBTIPO is not None:
+            setattr(colaborador, cls._ATRIBUTO_SUBTIPO, subtipo)
+        if carga is not None:
+            colaborador._carga = carga
+            carga.pendientes.append(dni)
+        return colaborador
+
+    def _completar(self, valores):
+        for campo, valor in valores:
+            if campo in ('nombre', 'apellido'):
+                valor = sys.intern(valor.capitalize())
+            elif campo == 'salario':
+                valor = float(valor)
+            setattr(self, ATRIBUTOS_DIFERIBLES[campo], valor)
+        self._carga = None
+
+    def _asegurar(self, campo):
+        carga = self._carga
+        if carga and campo in carga.faltantes:
+            carga.completar(self)
+        if self._carga is False:
+            raise LookupError(f'El colaborador con DNI {self.dni} ya no existe en la BBDD')
+
+    @property
+    def nombre(self):
+        self._asegurar('nombre')
+        return Colaborador.nombre.fget(self)
+
+    @property
+    def apellido(self):
+        self._asegurar('apellido')
+        return Colaborador.apellido.fget(self)
+
+    @property
+    def edad(self):
+        self._asegurar('edad')
+        return Colaborador.edad.fget(self)
+
+    @property
+    def salario(self):
+        self._asegurar('salario')
+        return Colaborador.salario.fget(self)
+
+    @salario.setter
+    def salario(self, nuevo_salario):
+        self._asegurar('salario') ### Si se cargara después pisaría el valor nuevo
+        Colaborador.salario.fset(self, nuevo_salario)
+
+class ColaboradorTiempoCompletoDiferido(ColaboradorDiferido, ColaboradorTiempoCompleto):
+    __slots__ = ('_carga',)
+    _ATRIBUTO_SUBTIPO = '_ColaboradorTiempoCompleto__departamento'
+
+class ColaboradorTiempoParcialDiferido(ColaboradorDiferido, ColaboradorTiempoParcial):
+    __slots__ = ('_carga',)
+    _ATRIBUTO_SUBTIPO = '_ColaboradorTiempoParcial__horas_semanales'
+
+class ColaboradorSinSubtipoDiferido(ColaboradorDiferido, Colaborador):
+    __slots__ = ('_carga',)
+
+#Pool de conexiones
+class PoolConexiones:
+    '''
+    Pool acotado de conexiones: en lugar de abrir una conexión nueva (handshake TCP + autenticación)
+    en cada operación se reutilizan, como máximo, "tamano" conexiones.
+    Las conexiones se crean a demanda con la función "fabrica" y se prestan mediante el
+    context manager conexion(), que garantiza su devolución al pool aunque ocurra una excepción
+    '''
+    def __init__(self, fabrica, tamano=5, timeout=None) -> None:
+        if tamano < 1:
+            raise ValueError('El tamaño del pool debe ser mayor o igual a 1')
+        self.__fabrica = fabrica
+        self.__tamano = tamano
+        self.__timeout = timeout ### Segundos a esperar por una conexión libre (None = sin límite)
+        self.__libres = queue.LifoQueue() ### LIFO: se reutiliza primero la conexión usada más recientemente
+        self.__lock = threading.Lock()
+        self.__creadas = 0
+        self.__prestadas = 0
+        self.__prestamos = 0
+        self.__tiempo_espera = 0.0
+
+    def __crear(self):
+        try:
+            connection = self.__fabrica()
+            if connection is None:
+                raise ConnectionError('No se pudo establecer la conexión con la BBDD')
+        except BaseException:
+            with self.__lock: ### Se libera el lugar reservado, falle como falle la fábrica
+                self.__creadas -= 1
+            raise
+        return connection
+
+    def __obtener(self):
+        try:
+            return self.__libres.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self.__lock: ### Reservamos el lugar antes de conectar para no pasarnos del tamaño
+            crear = self.__creadas < self.__tamano
+            if crear:
+                self.__creadas += 1
+        if crear:
+            return self.__crear()
+
+        try:
+            return self.__libres.get(timeout=self.__timeout)
+        except queue.Empty:
+            raise TimeoutError(f'No se liberó ninguna conexión del pool en {self.__timeout} segundos')
+
+    def __chequear(self, connection):
+        '''
+        Health check al prestar: si la conexión se cayó (timeout del servidor, reinicio, etc.)
+        se intenta reconectar y, si no se puede, se reemplaza por una nueva
+        '''
+        try:
+            connection.ping(reconnect=True, attempts=1, delay=0)
+            return connection
+        except Exception:
+            self.__cerrar_conexion(connection)
+            return self.__crear()
+
+    def __cerrar_conexion(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def __devolver(self, connection):
+        try:
+            ### Lo que no se leyó ni se confirmó no debe llegarle al próximo que use la conexión
+            if connection.unread_result:
+                connection.consume_results()
+            if connection.in_transaction:
+                connection.rollback()
+        except Exception:
+            self.__cerrar_conexion(connection)
+            with self.__lock:
+                self.__creadas -= 1
+            return
+        self.__libres.put(connection)
+
+    @contextmanager
+    def conexion(self):
+        '''
+        Presta una conexión del pool:
+            with pool.conexion() as connection:
+                ...
+        '''
+        inicio = time.perf_counter()
+        connection = self.__chequear(self.__obtener())
+        with self.__lock:
+            self.__prestadas += 1
+            self.__prestamos += 1
+            self.__tiempo_espera += time.perf_counter() - inicio
+        try:
+            yield connection
+        finally:
+            with self.__lock:
+                self.__prestadas -= 1
+            self.__devolver(connection)
+
+    def estadisticas(self):
+        '''
+        Devuelve un diccionario con el estado del pool para poder dimensionarlo
+        '''
+        with self.__lock:
+            return {
+                'tamano': self.__tamano,
+                'creadas': self.__creadas,
+                'prestadas': self.__prestadas,
+                'libres': self.__libres.qsize(),
+                'prestamos': self.__prestamos,
+                'tiempo_espera_total': self.__tiempo_espera,
+                'tiempo_espera_promedio': self.__tiempo_espera / self.__prestamos if self.__prestamos else 0.0
+            }
+
+    def cerrar(self):
+        '''
+        Cierra las conexiones libres del pool
+        '''
+        while True:
+            try:
+                connection = self.__libres.get_nowait()
+            except queue.Empty:
+                break
+            self.__cerrar_conexion(connection)
+            with self.__lock:
+                self.__creadas -= 1
+
+#Cache de lecturas
+class CacheColaboradores:
+    '''
+    Cache en memoria (read-through) de colaboradores por DNI, con tamaño acotado,
+    desalojo LRU (se descarta el menos usado recientemente) y vencimiento por TTL.
+    También guarda los "no encontrados" (cache negativo) para no volver a consultar
+    la BBDD por un DNI que no existe.
+    Lo que se guarda es una foto inmutable de la fila, no la instancia: quien la lee arma un
+    colaborador nuevo, así modificar el que se devolvió no altera lo que ven las lecturas siguientes
+    '''
+    def __init__(self, tamano=1024, ttl=300) -> None:
+        self.__tamano = tamano
+        self.__ttl = ttl ### Segundos que vive una entrada
+        self.__entradas = OrderedDict() ### dni -> (vencimiento, fila o None)
+        self.__lock = threading.Lock()
+        self.__aciertos = 0
+        self.__aciertos_negativos = 0
+        self.__fallos = 0
+        self.__desalojos = 0
+        self.__vencidos = 0
+        self.__invalidaciones = 0
+
+    def obtener(self, dni):
+        '''
+        Devuelve la tupla (encontrado, fila). Si encontrado es True y fila es None
+        quiere decir que ya sabemos que ese DNI no existe
+        '''
+        with self.__lock:
+            entrada = self.__entradas.get(dni)
+            if entrada is None:
+                self.__fallos += 1
+                return False, None
+            vencimiento, fila = entrada
+            if vencimiento < time.monotonic():
+                del self.__entradas[dni]
+                self.__vencidos += 1
+                self.__fallos += 1
+                return False, None
+            self.__entradas.move_to_end(dni) ### Pasa a ser el usado más recientemente
+            if fila is None:
+                self.__aciertos_negativos += 1
+            else:
+                self.__aciertos += 1
+            return True, fila
+
+    def guardar(self, dni, fila):
+        '''
+        fila: la fila de la consulta como diccionario (se guarda una copia inmutable) o None si no existe
+        '''
+        if self.__tamano <= 0:
+            return
+        with self.__lock:
+            self.__entradas[dni] = (time.monotonic() + self.__ttl, None if fila is None else tuple(fila.items()))
+            self.__entradas.move_to_end(dni)
+            while len(self.__entradas) > self.__tamano:
+                self.__entradas.popitem(last=False)
+                self.__desalojos += 1
+
+    def invalidar(self, dni):
+        with self.__lock:
+            if self.__entradas.pop(dni, None) is not None:
+                self.__invalidaciones += 1
+
+    def limpiar(self):
+        with self.__lock:
+            self.__entradas.clear()
+
+    def estadisticas(self):
+        with self.__lock:
+            return {
+                'tamano': self.__tamano,
+                'entradas': len(self.__entradas),
+                'aciertos': self.__aciertos,
+                'aciertos_negativos': self.__aciertos_negativos,
+                'fallos': self.__fallos,
+                'desalojos': self.__desalojos,
+                'vencidos': self.__vencidos,
+                'invalidaciones': self.__invalidaciones
+            }
+
+#Índice en memoria
+class IndicePrefijos:
+    '''
+    Índice ordenado en memoria (lista ordenada + búsqueda binaria con bisect) para buscar
+    colaboradores por prefijo de apellido o nombre sin ir a la BBDD.
+    Pensado para el modo embebido o con cache: se arma una vez con cargar() y GestionColaboradores
+    lo mantiene al día si se lo registra con agregar_indice()
+    '''
+    def __init__(self, columna='apellido', pares=()) -> None:
+        self.columna = columna
+        ### Tuplas (clave normalizada, dni): ordenadas por clave y, a igual clave, por DNI
+        self.__entradas = sorted((self.normalizar(valor), dni) for valor, dni in pares)
+        self.__claves = {dni: clave for clave, dni in self.__entradas} ### Para ubicar la entrada de un DNI al quitarlo
+        self.__lock = threading.Lock()
+
+    @classmethod
+    def cargar(cls, gestion, columna='apellido', tamano_lote=10_000):
+        posicion = {'nombre': 1, 'apellido': 2}[columna] ### Posición de la columna en CONSULTA_COLABORADORES
+        pares = ((fila[posicion], fila[0]) for filas in gestion._leer_filas(tamano_lote, dictionary=False) for fila in filas)
+        return cls(columna, pares)
+
+    @staticmethod
+    def normalizar(valor):
+        return valor.casefold()
+
+    def __len__(self):
+        return len(self.__entradas)
+
+    def agregar(self, colaboradores):
+        '''
+        Agrega uno o varios colaboradores (para muchos conviene pasarlos juntos: se reordena una sola vez)
+        '''
+        if isinstance(colaboradores, Colaborador):
+            colaboradores = [colaboradores]
+        nuevas = [(self.normalizar(getattr(colaborador, self.columna)), colaborador.dni) for colaborador in colaboradores]
+        with self.__lock:
+            if len(nuevas) == 1:
+                bisect.insort(self.__entradas, nuevas[0])
+            else:
+                self.__entradas.extend(nuevas)
+                self.__entradas.sort()
+            self.__claves.update((dni, clave) for clave, dni in nuevas)
+
+    def quitar(self, dni):
+        with self.__lock:
+            clave = self.__claves.pop(dni, None)
+            if clave is None:
+                return
+            posicion = bisect.bisect_left(self.__entradas, (clave, dni))
+            del self.__entradas[posicion]
+
+    def buscar(self, prefijo, limite=50, despues_de=None):
+        '''
+        DNIs cuyo apellido (o nombre) empieza con prefijo, con la misma paginación por keyset que
+        buscar_colaboradores: devuelve (dnis, siguiente) y siguiente se pasa como despues_de
+        '''
+        prefijo = self.normalizar(prefijo)
+        with self.__lock:
+            if despues_de is None:
+                inicio = bisect.bisect_left(self.__entradas, (prefijo,))
+            else:
+                inicio = bisect.bisect_right(self.__entradas, despues_de)
+            pagina = self.__entradas[inicio:inicio + limite + 1]
+        pagina = [entrada for entrada in pagina if entrada[0].startswith(prefijo)]
+        siguiente = pagina[limite - 1] if len(pagina) > limite else None
+        return [dni for _, dni in pagina[:limite]], siguiente
+
+### Consulta base que trae cada colaborador junto con los datos de su subtipo
+CONSULTA_COLABORADORES = '''
+SELECT c.dni, c.nombre, c.apellido, c.edad, c.salario,
+       tc.departamento, tp.horas_semanales
+FROM colaboradores c
+LEFT JOIN colaboradortiempocompleto tc ON tc.dni = c.dni
+LEFT JOIN colaboradortiempoparcial tp ON tp.dni = c.dni
+'''
+
+@functools.lru_cache(maxsize=32)
+def consulta_proyectada(columnas):
+    '''
+    Como CONSULTA_COLABORADORES pero sólo con dni, las columnas indicadas (de ATRIBUTOS_DIFERIBLES)
+    y las de los subtipos, que hacen falta para saber qué clase instanciar.
+    Trae una página por "keyset": los siguientes %s colaboradores con DNI mayor a %s
+    '''
+    seleccion = ''.join(f', c.{columna}' for columna in columnas)
+    return f'''
+SELECT c.dni{seleccion}, tc.departamento, tp.horas_semanales
+FROM colaboradores c
+LEFT JOIN colaboradortiempocompleto tc ON tc.dni = c.dni
+LEFT JOIN colaboradortiempoparcial tp ON tp.dni = c.dni
+WHERE c.dni > %s
+ORDER BY c.dni
+LIMIT %s
+'''
+
+def hidratar_lote(filas):
+    '''
+    Instancia (y valida) los colaboradores de un lote de tuplas de CONSULTA_COLABORADORES.
+    Es una función de módulo para que un ProcessPoolExecutor pueda ejecutarla en otro proceso
+    '''
+    colaboradores = []
+    for dni, nombre, apellido, edad, salario, departamento, horas_semanales in filas:
+        if departamento is not None:
+            colaboradores.append(ColaboradorTiempoCompleto(dni, nombre, apellido, edad, salario, departamento))
+        elif horas_semanales is not None:
+            colaboradores.append(ColaboradorTiempoParcial(dni, nombre, apellido, edad, salario, horas_semanales))
+        else:
+            colaboradores.append(Colaborador(dni, nombre, apellido, edad, salario))
+    return colaboradores
+
+### Tablas de cada subtipo: su fila se borra en cascada con la de colaboradores (ON DELETE CASCADE)
+TABLAS_SUBTIPO = ('colaboradortiempocompleto', 'colaboradortiempoparcial')
+
+### Valor inicial del contador de cambios_secuencia: la mayor secuencia ya usada (en BBDD que
+### venían numerando con AUTO_INCREMENT), así no se repite ninguna aunque se haya compactado el log
+CONSULTA_ULTIMA_SECUENCIA = '''
+SELECT 1, COALESCE(MAX(secuencia), 0) FROM (
+    SELECT MAX(secuencia) AS secuencia FROM cambios_colaboradores
+    UNION ALL
+    SELECT MAX(secuencia) FROM cambios_snapshot
+) AS usadas
+'''
+
+#Backends de almacenamiento
+class BackendMySQL:
+    '''
+    Backend por defecto: servidor MySQL configurado con las variables DB_* del .env
+    '''
+    nombre = 'mysql'
+    ### Índices de búsqueda (buscar_colaboradores) por tabla, los mismos que esquema() declara en cada
+    ### CREATE TABLE: migraciones() agrega los que falten en tablas creadas antes de que existieran
+    INDICES = {
+        'colaboradores': (
+            ('idx_colaboradores_apellido', 'apellido, dni'),
+            ('idx_colaboradores_nombre', 'nombre, dni'),
+            ('idx_colaboradores_edad', 'edad'),
+            ('idx_colaboradores_salario', 'salario')
+        ),
+        'colaboradortiempocompleto': (
+            ('idx_tiempocompleto_departamento', 'departamento'),
+        )
+    }
+
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.__esquema_creado = False
+
+    @property
+    def Error(self):
+        '''
+        Excepción base del driver, para capturar errores sin depender del motor
+        '''
+        return importar_mysql().Error
+
+    @property
+    def IntegrityError(self):
+        '''
+        Clave primaria duplicada
+        '''
+        return importar_mysql().IntegrityError
+
+    def es_clave_duplicada(self, error):
+        '''
+        Si el IntegrityError es por clave primaria repetida (ER_DUP_ENTRY) y no, por ej., una clave foránea o un NOT NULL
+        '''
+        return getattr(error, 'errno', None) == 1062
+
+    @functools.cached_property
+    def parametros(self):
+        '''
+        Datos de conexión del .env: se leen en la primera conexión y no al crear el backend
+        '''
+        return {
+            'host': config('DB_HOST'),
+            'database': config('DB_NAME'),
+            'user': config('DB_USER'),
+            'password': config('DB_PASSWORD'),
+            'port': config('DB_PORT')
+        }
+
+    def conectar(self):
+        connection = importar_mysql().connect(**self.parametros)
+
+        if connection.is_connected():
+            with self.__lock: ### Igual que en SQLite: las tablas se crean (o se migran) con la primera conexión
+                if not self.__esquema_creado:
+                    try:
+                        with connection.cursor() as cursor:
+                            for sentencia in self.migraciones(cursor) + self.esquema():
+                                cursor.execute(sentencia)
+                        connection.commit()
+                    except Exception:
+                        connection.close()
+                        raise
+                    self.__esquema_creado = True
+            return connection
+
+    def esquema(self):
+        return [
+            '''
+            CREATE TABLE IF NOT EXISTS colaboradores (
+                dni INT PRIMARY KEY,
+                nombre VARCHAR(100) NOT NULL,
+                apellido VARCHAR(100) NOT NULL,
+                edad INT NOT NULL,
+                salario DECIMAL(12, 2) NOT NULL,
+                INDEX idx_colaboradores_apellido (apellido, dni),
+                INDEX idx_colaboradores_nombre (nombre, dni),
+                INDEX idx_colaboradores_edad (edad),
+                INDEX idx_colaboradores_salario (salario)
+            )
+            ''',
+            '''
+            CREATE TABLE IF NOT EXISTS colaboradortiempocompleto (
+                dni INT PRIMARY KEY,
+                departamento VARCHAR(100) NOT NULL,
+                INDEX idx_tiempocompleto_departamento (departamento),
+                CONSTRAINT fk_colaboradortiempocompleto_dni FOREIGN KEY (dni) REFERENCES colaboradores (dni) ON DELETE CASCADE
+            )
+            ''',
+            '''
+            CREATE TABLE IF NOT EXISTS colaboradortiempoparcial (
+                dni INT PRIMARY KEY,
+                horas_semanales INT NOT NULL,
+                CONSTRAINT fk_colaboradortiempoparcial_dni FOREIGN KEY (dni) REFERENCES colaboradores (dni) ON DELETE CASCADE
+            )
+            ''',
+            '''
+            CREATE TABLE IF NOT EXISTS cambios_colaboradores (
+                secuencia BIGINT PRIMARY KEY,
+                dni INT NOT NULL,
+                operacion VARCHAR(20) NOT NULL,
+                datos TEXT,
+                fecha TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+            ''',
+            '''
+            CREATE TABLE IF NOT EXISTS cambios_snapshot (
+                dni INT PRIMARY KEY,
+                secuencia BIGINT NOT NULL,
+                operacion VARCHAR(20) NOT NULL,
+                datos TEXT,
+                INDEX idx_cambios_snapshot_secuencia (secuencia)
+            )
+            ''',
+            ### Contador de la secuencia del log (ver _registrar_cambios); arranca después de la última ya usada
+            '''
+            CREATE TABLE IF NOT EXISTS cambios_secuencia (
+                id INT PRIMARY KEY,
+                valor BIGINT NOT NULL
+            )
+            ''',
+            f'INSERT IGNORE INTO cambios_secuencia (id, valor) {CONSULTA_ULTIMA_SECUENCIA}'
+        ]
+
+    def migraciones(self, cursor):
+        '''
+        Sentencias para llevar tablas creadas con versiones anteriores al esquema actual:
+        clave primaria por DNI, índices de búsqueda y claves foráneas de los subtipos con ON DELETE CASCADE.
+        Antes de agregar una clave foránea se borran las filas huérfanas (sin colaborador)
+        '''
+        tablas = ('colaboradores',) + TABLAS_SUBTIPO
+        marcadores = ', '.join(['%s'] * len(tablas))
+        cursor.execute(f'''
+        SELECT TABLE_NAME FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({marcadores})
+        ''', tablas)
+        existentes = {tabla for (tabla,) in cursor.fetchall()}
+        cursor.execute(f'''
+        SELECT TABLE_NAME FROM information_schema.TABLE_CONSTRAINTS
+        WHERE TABLE_SCHEMA = DATABASE() AND CONSTRAINT_TYPE = 'PRIMARY KEY' AND TABLE_NAME IN ({marcadores})
+        ''', tablas)
+        con_clave_primaria = {tabla for (tabla,) in cursor.fetchall()}
+        cursor.execute('''
+        SELECT TABLE_NAME, CONSTRAINT_NAME, DELETE_RULE FROM information_schema.REFERENTIAL_CONSTRAINTS
+        WHERE CONSTRAINT_SCHEMA = DATABASE() AND REFERENCED_TABLE_NAME = 'colaboradores'
+        ''')
+        foraneas = {}
+        for tabla, restriccion, regla in cursor.fetchall():
+            foraneas.setdefault(tabla, []).append((restriccion, regla))
+        cursor.execute(f'''
+        SELECT DISTINCT TABLE_NAME, INDEX_NAME FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({marcadores})
+        ''', tablas)
+        indices = set(cursor.fetchall())
+
+        sentencias = []
+        for tabla in tablas:
+            if tabla in existentes and tabla not in con_clave_primaria:
+                sentencias.append(f'ALTER TABLE {tabla} ADD PRIMARY KEY (dni)')
+        for tabla, definiciones in self.INDICES.items():
+            if tabla in existentes:
+                sentencias += [f'ALTER TABLE {tabla} ADD INDEX {indice} ({columnas})'
+                               for indice, columnas in definiciones if (tabla, indice) not in indices]
+        for tabla in TABLAS_SUBTIPO:
+            if tabla not in existentes or 'colaboradores' not in existentes:
+                continue
+            if any(regla == 'CASCADE' for _, regla in foraneas.get(tabla, [])):
+                continue
+            for restriccion, _ in foraneas.get(tabla, []):
+                sentencias.append(f'ALTER TABLE {tabla} DROP FOREIGN KEY {restriccion}')
+            sentencias.append(f'DELETE t FROM {tabla} t LEFT JOIN colaboradores c ON c.dni = t.dni WHERE c.dni IS NULL')
+            sentencias.append(f'ALTER TABLE {tabla} ADD CONSTRAINT fk_{tabla}_dni FOREIGN KEY (dni) '
+                              'REFERENCES colaboradores (dni) ON DELETE CASCADE')
+        return sentencias
+
+    def upsert(self, tabla, columnas):
+        '''
+        INSERT que actualiza la fila si la clave primaria (la primera columna) ya existe
+        '''
+        marcadores = ', '.join(['%s'] * len(columnas))
+        asignaciones = ', '.join(f'{columna} = VALUES({columna})' for columna in columnas[1:])
+        return f'INSERT INTO {tabla} ({", ".join(columnas)}) VALUES ({marcadores}) ON DUPLICATE KEY UPDATE {asignaciones}'
+
+    def prefijo(self, columna, prefijo):
+        '''
+        Condición (y parámetros) para "columna empieza con prefijo". Con las collations de MySQL
+        (acentos y mayúsculas equivalentes, signos antes que las letras) no sirve armar un rango con
+        la letra siguiente: se usa LIKE 'prefijo%', que también aprovecha el índice
+        '''
+        escapado = prefijo.replace('!', '!!').replace('%', '!%').replace('_', '!_')
+        return f"{columna} LIKE %s ESCAPE '!'", [escapado + '%']
+
+class CursorSQLite:
+    '''
+    Adapta el cursor de sqlite3 a la interfaz que usamos del cursor de mysql.connector:
+    marcadores %s, filas como diccionario (dictionary=True) y uso con "with"
+    '''
+    def __init__(self, cursor, dictionary=False) -> None:
+        self.__cursor = cursor
+        if dictionary:
+            cursor.row_factory = lambda cur, fila: {columna[0]: valor for columna, valor in zip(cur.description, fila)}
+
+    def execute(self, query, params=()):
+        self.__cursor.execute(traducir_marcadores(query), params)
+
+    def executemany(self, query, lista_params):
+        self.__cursor.executemany(traducir_marcadores(query), lista_params)
+
+    def fetchone(self):
+        return self.__cursor.fetchone()
+
+    def fetchmany(self, tamano):
+        return self.__cursor.fetchmany(tamano)
+
+    def fetchall(self):
+        return self.__cursor.fetchall()
+
+    @property
+    def rowcount(self):
+        return self.__cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self.__cursor.lastrowid
+
+    def close(self):
+        self.__cursor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.close()
+
+class ConexionSQLite:
+    '''
+    Adapta una conexión de sqlite3 a lo que esperan GestionColaboradores y PoolConexiones de una conexión de mysql.connector
+    '''
+    unread_result = False ### sqlite3 no deja resultados pendientes en el "servidor"
+
+    def __init__(self, connection) -> None:
+        self.__connection = connection
+        self.__abierta = True
+
+    def cursor(self, dictionary=False):
+        return CursorSQLite(self.__connection.cursor(), dictionary)
+
+    def commit(self):
+        self.__connection.commit()
+
+    def rollback(self):
+        self.__connection.rollback()
+
+    def start_transaction(self):
+        self.__connection.execute('BEGIN')
+
+    @property
+    def in_transaction(self):
+        return self.__connection.in_transaction
+
+    def consume_results(self):
+        pass
+
+    def is_connected(self):
+        return self.__abierta
+
+    def ping(self, reconnect=False, attempts=1, delay=0):
+        self.__connection.execute('SELECT 1')
+
+    def close(self):
+        self.__abierta = False
+        self.__connection.close()
+
+@functools.lru_cache(maxsize=256)
+def traducir_marcadores(query):
+    '''
+    mysql.connector usa %s como marcador de parámetros y sqlite3 usa ?
+    '''
+    return query.replace('%s', '?')
+
+class BackendSQLite:
+    '''
+    Backend embebido: la BBDD es un archivo local (DB_SQLITE_PATH), sin servidor ni red de por medio.
+    Se usa modo WAL para que las lecturas no se bloqueen con las escrituras y sqlite3 reutiliza las
+    sentencias preparadas (cached_statements). Con ':memory:' se usa una BBDD en memoria compartida
+    por todas las conexiones del pool, útil para pruebas y benchmarks
+    '''
+    nombre = 'sqlite'
+    ### Columnas propias de cada subtipo (para crear la tabla y para reconstruirla al migrar)
+    COLUMNAS_SUBTIPO = {
+        'colaboradortiempocompleto': ('departamento', 'departamento TEXT NOT NULL'),
+        'colaboradortiempoparcial': ('horas_semanales', 'horas_semanales INTEGER NOT NULL')
+    }
+
+    def __init__(self, ruta=None) -> None:
+        self.ruta = ruta if ruta is not None else config('DB_SQLITE_PATH', default='colaboradores.db')
+        self.__uri = False
+        self.__ancla = None
+        if self.ruta == ':memory:':
+            ### Cada conexión a ':memory:' sería una BBDD distinta: se comparte por nombre y se mantiene
+            ### una conexión abierta para que no se borre mientras el pool no tenga ninguna
+            self.ruta = f'file:colaboradores_{id(self)}?mode=memory&cache=shared'
+            self.__uri = True
+            self.__ancla = self.__abrir()
+        self.__lock = threading.Lock()
+        self.__esquema_creado = False
+
+    @property
+    def Error(self):
+        import sqlite3
+        return sqlite3.Error
+
+    @property
+    def IntegrityError(self):
+        import sqlite3
+        return sqlite3.IntegrityError
+
+    def es_clave_duplicada(self, error):
+        '''
+        Si el IntegrityError es por clave primaria o UNIQUE repetida y no, por ej., una clave foránea o un NOT NULL
+        '''
+        mensaje = str(error)
+        return 'UNIQUE constraint failed' in mensaje or 'PRIMARY KEY' in mensaje
+
+    def __abrir(self):
+        import sqlite3
+        return sqlite3.connect(self.ruta, uri=self.__uri, timeout=30, check_same_thread=False, cached_statements=256)
+
+    def conectar(self):
+        connection = self.__abrir()
+        connection.execute('PRAGMA journal_mode = WAL')
+        connection.execute('PRAGMA synchronous = NORMAL')
+        connection.execute('PRAGMA foreign_keys = ON')
+        with self.__lock: ### La BBDD embebida se crea (o se migra) sola la primera vez que se conecta
+            if not self.__esquema_creado:
+                for sentencia in self.migraciones(connection.cursor()) + self.esquema():
+                    connection.execute(sentencia)
+                connection.commit()
+                self.__esquema_creado = True
+        return ConexionSQLite(connection)
+
+    def esquema(self):
+        return [
+            '''
+            CREATE TABLE IF NOT EXISTS colaboradores (
+                dni INTEGER PRIMARY KEY,
+                nombre TEXT NOT NULL,
+                apellido TEXT NOT NULL,
+                edad INTEGER NOT NULL,
+                salario REAL NOT NULL
+            )
+            ''',
+            *(self.tabla_subtipo(tabla) for tabla in TABLAS_SUBTIPO),
+            ### Índices para las búsquedas por prefijo, departamento y rangos (buscar_colaboradores)
+            'CREATE INDEX IF NOT EXISTS idx_colaboradores_apellido ON colaboradores (apellido, dni)',
+            'CREATE INDEX IF NOT EXISTS idx_colaboradores_nombre ON colaboradores (nombre, dni)',
+            'CREATE INDEX IF NOT EXISTS idx_colaboradores_edad ON colaboradores (edad)',
+            'CREATE INDEX IF NOT EXISTS idx_colaboradores_salario ON colaboradores (salario)',
+            'CREATE INDEX IF NOT EXISTS idx_tiempocompleto_departamento ON colaboradortiempocompleto (departamento)',
+            '''
+            CREATE TABLE IF NOT EXISTS cambios_colaboradores (
+                secuencia INTEGER PRIMARY KEY,
+                dni INTEGER NOT NULL,
+                operacion TEXT NOT NULL,
+                datos TEXT,
+                fecha TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+            ''',
+            '''
+            CREATE TABLE IF NOT EXISTS cambios_snapshot (
+                dni INTEGER PRIMARY KEY,
+                secuencia INTEGER NOT NULL,
+                operacion TEXT NOT NULL,
+                datos TEXT
+            )
+            ''',
+            'CREATE INDEX IF NOT EXISTS idx_cambios_snapshot_secuencia ON cambios_snapshot (secuencia)',
+            '''
+            CREATE TABLE IF NOT EXISTS cambios_secuencia (
+                id INTEGER PRIMARY KEY,
+                valor INTEGER NOT NULL
+            )
+            ''',
+            f'INSERT OR IGNORE INTO cambios_secuencia (id, valor) {CONSULTA_ULTIMA_SECUENCIA}'
+        ]
+
+    def tabla_subtipo(self, tabla, nombre=None):
+        _, definicion = self.COLUMNAS_SUBTIPO[tabla]
+        return f'''
+            CREATE TABLE IF NOT EXISTS {nombre or tabla} (
+                dni INTEGER PRIMARY KEY REFERENCES colaboradores (dni) ON DELETE CASCADE,
+                {definicion}
+            )
+            '''
+
+    def migraciones(self, cursor):
+        '''
+        SQLite no permite cambiar una clave foránea con ALTER TABLE: las tablas de subtipo creadas
+        sin ON DELETE CASCADE se reconstruyen (copiando sólo las filas que tienen colaborador).
+        Las claves foráneas se desactivan mientras tanto y el COMMIT va antes de reactivarlas
+        porque PRAGMA foreign_keys no tiene efecto dentro de una transacción
+        '''
+        sentencias = []
+        for tabla in TABLAS_SUBTIPO:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (tabla,))
+            if cursor.fetchone() is None:
+                continue
+            cursor.execute(f'PRAGMA foreign_key_list({tabla})')
+            if any(fila[2] == 'colaboradores' and fila[6] == 'CASCADE' for fila in cursor.fetchall()):
+                continue
+            columna, _ = self.COLUMNAS_SUBTIPO[tabla]
+            sentencias += [
+                self.tabla_subtipo(tabla, f'{tabla}_nueva'),
+                f'INSERT INTO {tabla}_nueva (dni, {columna}) SELECT t.dni, t.{columna} FROM {tabla} t JOIN colaboradores c ON c.dni = t.dni',
+                f'DROP TABLE {tabla}',
+                f'ALTER TABLE {tabla}_nueva RENAME TO {tabla}'
+            ]
+        if sentencias:
+            sentencias = ['PRAGMA foreign_keys = OFF'] + sentencias + ['COMMIT', 'PRAGMA foreign_keys = ON']
+        return sentencias
+
+    def upsert(self, tabla, columnas):
+        '''
+        INSERT que actualiza la fila si la clave primaria (la primera columna) ya existe
+        '''
+        marcadores = ', '.join(['%s'] * len(columnas))
+        asignaciones = ', '.join(f'{columna} = excluded.{columna}' for columna in columnas[1:])
+        return (f'INSERT INTO {tabla} ({", ".join(columnas)}) VALUES ({marcadores}) '
+                f'ON CONFLICT ({columnas[0]}) DO UPDATE SET {asignaciones}')
+
+    def prefijo(self, columna, prefijo):
+        '''
+        Condición (y parámetros) para "columna empieza con prefijo": el rango [prefijo, prefijo con la
+        última letra siguiente) usa el índice, cosa que LIKE no hace en SQLite (no distingue mayúsculas).
+        Vale porque las columnas de texto de SQLite comparan en binario
+        '''
+        return f'{columna} >= %s AND {columna} < %s', [prefijo, prefijo[:-1] + chr(ord(prefijo[-1]) + 1)]
+
+def crear_backend():
+    '''
+    Elige el motor de BBDD según DB_BACKEND (mysql por defecto, o sqlite)
+    '''
+    backends = {backend.nombre: backend for backend in (BackendMySQL, BackendSQLite)}
+    nombre = config('DB_BACKEND', default='mysql').lower()
+    if nombre not in backends:
+        raise ValueError(f'DB_BACKEND debe ser uno de: {", ".join(backends)}')
+    return backends[nombre]()
+
+class RegistroInvalido:
+    '''
+    Lugar de un registro que no se pudo leer del archivo de importación (por ej. una línea JSON mal formada).
+    La carga masiva lo informa como rechazado en vez de cortar la importación
+    '''
+    __slots__ = ('motivo',)
+
+    def __init__(self, motivo) -> None:
+        self.motivo = motivo
+
 #Gestion
 class GestionColaboradores:
-    def __init__(self) -> None:
+    def __init__(self, backend=None) -> None:
+        '''
+        Settea el backend (motor de BBDD) con el que se van a crear las conexiones
+        al instanciar un objeto de clase GestionColaboradores.
+        Si no se indica uno se elige según DB_BACKEND.
+        El backend, el pool, el cache y la instrumentación se crean (y leen su configuración)
+        recién la primera vez que se usan: crear la instancia no lee el .env ni carga el driver
+        '''
+        if backend is not None:
+            self.backend = backend
+        self.indices = [] ### Índices en memoria opcionales (IndicePrefijos) que se mantienen al día con las altas y bajas
+        self._local = threading.local() ### Conexión fijada por transaccion() en cada hilo
+
+    @functools.cached_property
+    def backend(self):
+        return crear_backend()
+
+    @functools.cached_property
+    def pool(self):
         '''
-        Settea las variables necesarias para crear una conexión
-        al instanciar un objeto de clase GestionColaboradores
+        Las conexiones se toman de un pool en lugar de abrir una nueva en cada operación
         '''
-        self.host = config('DB_HOST')
-        self.database = config('DB_NAME')
-        self.user = config('DB_USER')
-        self.password = config('DB_PASSWORD')
-        self.port = config('DB_PORT')
+        return PoolConexiones(self.connect,
+                              tamano=config('DB_POOL_SIZE', default=5, cast=int),
+                              timeout=config('DB_POOL_TIMEOUT', default=30, cast=float))
+
+    @functools.cached_property
+    def cache(self):
+        '''
+        Cache de lecturas por DNI (CACHE_SIZE = 0 lo desactiva)
+        '''
+        return CacheColaboradores(tamano=config('CACHE_SIZE', default=1024, cast=int),
+                                  ttl=config('CACHE_TTL', default=300, cast=float))
+
+    @functools.cached_property
+    def metricas(self):
+        '''
+        Instrumentación (latencias, consultas por operación, log de consultas lentas); None = desactivada
+        '''
+        if not config('METRICS_ENABLED', default=False, cast=bool):
+            return None
+        return Metricas(umbral_lento=config('SLOW_QUERY_MS', default=100, cast=float) / 1000,
+                        log_lentas=config('SLOW_QUERY_LOG', default='') or None)
     
     def connect(self):
         '''
         Método para establecer la conexión con la BBDD
+        (el pool lo usa como fábrica cada vez que necesita una conexión nueva)
         '''
         try:
-            connection = mysql.connector.connect(
-                host = self.host,
-                database = self.database,
-                user = self.user,  
-                password = self.password,
-                port = self.port
-            )
-
-            if connection.is_connected():
-                return connection
-            
-        except Error as e:
+            return self.backend.conectar()
+        except self.backend.Error as e:
             print(f'Error al conectarse a la BBDD: {e}')
             return None
 
+    @contextmanager
+    def transaccion(self):
+        '''
+        Agrupa varias operaciones en una sola transacción sobre una misma conexión:
+            with gestion.transaccion():
+                gestion.crear_colaborador(...)
+                gestion.actualizar_colaborador(...)
+        Los métodos no confirman por su cuenta; se confirma todo al salir del bloque.
+        Cada operación corre dentro de un SAVEPOINT, así la que falla se deshace sola sin
+        arrastrar a las demás. Si el bloque termina con una excepción se hace rollback de todo
+        y se descartan el cache y los índices en memoria (pueden tener cambios que no se guardaron)
+        '''
+        if getattr(self._local, 'connection', None) is not None: ### Transacción anidada: se suma a la de afuera
+            yield self._local.connection
+            return
+        try:
+            with self._conexion() as connection:
+                connection.start_transaction()
+                self._local.connection = connection
+                try:
+                    yield connection
+                    self._escribir_cambios(connection)
+                    connection.commit()
+                finally:
+                    self._local.connection = None
+        except BaseException:
+            ### El pool hace rollback al devolver la conexión
+            self.cache.limpiar()
+            self.indices = [IndicePrefijos.cargar(self, indice.columna) for indice in self.indices]
+            raise
+
+    def _confirmar(self, connection):
+        '''
+        Commit de una operación, salvo que sea parte de una transaccion() (se confirma al final)
+        '''
+        if getattr(self._local, 'connection', None) is None:
+            self._escribir_cambios(connection)
+            connection.commit()
+
+    @contextmanager
+    def _conexion(self):
+        '''
+        Presta una conexión del pool; con la instrumentación activa se mide la espera
+        y se devuelve envuelta para que se midan sus consultas.
+        Dentro de una transaccion() se usa la conexión de la transacción.
+        Los cambios anotados para el log (_registrar_cambios) viven lo mismo que la conexión prestada
+        y, dentro de una transacción, se descartan junto con el SAVEPOINT de la operación que falla
+        '''
+        fijada = getattr(self._local, 'connection', None)
+        if fijada is not None:
+            marca = len(self._local.cambios)
+            with fijada.cursor() as cursor:
+                cursor.execute('SAVEPOINT operacion')
+            try:
+                yield fijada
+            except BaseException:
+                del self._local.cambios[marca:]
+                with fijada.cursor() as cursor:
+                    cursor.execute('ROLLBACK TO SAVEPOINT operacion')
+                raise
+            with fijada.cursor() as cursor:
+                cursor.execute('RELEASE SAVEPOINT operacion')
+            return
+        anteriores = getattr(self._local, 'cambios', None)
+        self._local.cambios = []
+        try:
+            if self.metricas is None:
+                with self.pool.conexion() as connection:
+                    yield connection
+                return
+            inicio = time.perf_counter()
+            with self.pool.conexion() as connection:
+                self.metricas.registrar_espera_conexion(time.perf_counter() - inicio)
+                yield ConexionInstrumentada(connection, self.metricas)
+        finally:
+            self._local.cambios = anteriores
+
+    def exportar_metricas(self, formato='json', ruta=None):
+        '''
+        Snapshot de las métricas en formato 'json', 'texto' o 'prometheus' (junto con las
+        estadísticas del pool y del cache). Si se indica ruta se escribe en ese archivo
+        '''
+        if self.metricas is None:
+            raise RuntimeError('La instrumentación está desactivada (METRICS_ENABLED)')
+        contenido = self.metricas.exportar(formato, extras={'pool': self.estadisticas_pool(), 'cache': self.estadisticas_cache()})
+        if ruta:
+            with open(ruta, 'w', encoding='utf-8') as archivo:
+                archivo.write(contenido)
+        return contenido
+
+    @instrumentado
+    def crear_esquema(self):
+        '''
+        Crea las tablas si no existen y migra las de versiones anteriores (claves primarias,
+        claves foráneas en cascada y contador del log de cambios). Los dos backends ya lo hacen
+        solos con la primera conexión; sirve para volver a correrlo sin reiniciar el proceso
+        '''
+        with self._conexion() as connection:
+            with connection.cursor() as cursor:
+                for sentencia in self.backend.migraciones(cursor) + self.backend.esquema():
+                    cursor.execute(sentencia)
+            self._confirmar(connection)
+
+    def agregar_indice(self, columna='apellido'):
+        '''
+        Arma un IndicePrefijos con los datos actuales y lo registra para mantenerlo al día
+        '''
+        indice = IndicePrefijos.cargar(self, columna)
+        self.indices.append(indice)
+        return indice
+
+    def estadisticas_pool(self):
+        '''
+        Conexiones creadas, prestadas y libres, y tiempo de espera para obtener una conexión
+        '''
+        return self.pool.estadisticas()
+
+    @instrumentado
     def crear_colaborador(self, colaborador):
         '''
         Este método va a recibir una instancia de Colaborador cuando llamemos desde main.py. Es decir, recibirá un input desde el usuario
         Dicha instancia será un colaborador parcial o de tiempo completo
         Ese objeto con esos datos pasa a este método para crear el colaborador
         El parámetro colaborador del método es a su vez una instancia de las subclases
+        No se consulta antes si el DNI existe: la clave primaria rechaza el duplicado en el mismo INSERT,
+        así dos altas simultáneas del mismo DNI no pueden pasar las dos
         '''
         try:
-            connection = self.connect() ### Crea (recibe) una conexión del método antes definido
-            with connection.cursor() as cursor: ### El método cursor() permite realizar consultas a la BBDD
-                ## Verificar si el DNI ya existe
-                cursor.execute('SELECT dni FROM colaboradores WHERE dni = %s', (colaborador.dni, )) ### Con el comando (comodín) evitamos inyecciones SQL /// Se le pone una coma al final porque el método espera una tupla
-                if cursor.fetchone(): ### Trae el primer registro encontrado (los DNI son únicos)
-                    print(f'Ya existe el colaborador con el dni: {colaborador.dni}')
-                    return 
-                ## Insertar colaborador dependiendo del tipo
-                if isinstance(colaborador, ColaboradorTiempoCompleto):
-                    query = '''
-                    INSERT INTO colaboradores (dni, nombre, apellido, edad, salario)
-                    VALUES (%s, %s, %s, %s, %s)
-                    '''
-
-                    cursor.execute(query, (colaborador.dni, colaborador.nombre, colaborador.apellido,
-                                           colaborador.edad, colaborador.salario))
-                    
-                    query = '''
-                    INSERT INTO colaboradortiempocompleto (dni, departamento)
-                    VALUES (%s, %s)
-                    '''
-
-                    cursor.execute(query, (colaborador.dni, colaborador.departamento))
-                elif isinstance(colaborador, ColaboradorTiempoParcial):
-                    query = '''
-                    INSERT INTO colaboradores (dni, nombre, apellido, edad, salario)
-                    VALUES (%s, %s, %s, %s, %s)
-                    '''
-
-                    cursor.execute(query, (colaborador.dni, colaborador.nombre, colaborador.apellido,
-                                           colaborador.edad, colaborador.salario))
-                    
-                    query = '''
-                    INSERT INTO colaboradortiempoparcial (dni, Horas_semanales)
-                    VALUES (%s, %s)
-                    '''
-
-                    cursor.execute(query, (colaborador.dni, colaborador.horas_semanales))
-                ## Guardar la consulta en la BBDD
-                connection.commit()
-                print(f'Colaborador {colaborador.nombre} {colaborador.apellido} creado con éxito')
+            with self._conexion() as connection: ### Toma (recibe) una conexión del pool y la devuelve al terminar
+                with connection.cursor() as cursor: ### El método cursor() permite realizar consultas a la BBDD
+                    try:
+                        cursor.execute('''
+                        INSERT INTO colaboradores (dni, nombre, apellido, edad, salario)
+                        VALUES (%s, %s, %s, %s, %s)
+                        ''', (colaborador.dni, colaborador.nombre, colaborador.apellido,
+                              colaborador.edad, colaborador.salario)) ### Con el comando (comodín) evitamos inyecciones SQL
+                    except self.backend.IntegrityError as e:
+                        if not self.backend.es_clave_duplicada(e):
+                            raise
+                        print(f'Ya existe el colaborador con el dni: {colaborador.dni}')
+                        return False
+                    ## Insertar los datos del subtipo
+                    if isinstance(colaborador, ColaboradorTiempoCompleto):
+                        cursor.execute('INSERT INTO colaboradortiempocompleto (dni, departamento) VALUES (%s, %s)',
+                                       (colaborador.dni, colaborador.departamento))
+                    elif isinstance(colaborador, ColaboradorTiempoParcial):
+                        cursor.execute('INSERT INTO colaboradortiempoparcial (dni, horas_semanales) VALUES (%s, %s)',
+                                       (colaborador.dni, colaborador.horas_semanales))
+                    self._registrar_cambios([(colaborador.dni, 'crear', colaborador.to_dict())])
+                    ## Guardar la consulta en la BBDD
+                    self._confirmar(connection)
+                    self.cache.invalidar(colaborador.dni) ### Puede haber quedado guardado como "no encontrado"
+                    for indice in self.indices:
+                        indice.agregar(colaborador)
+                    print(f'Colaborador {colaborador.nombre} {colaborador.apellido} creado con éxito')
+                    return True
         except Exception as e:
             print(f'Error inesperado al crear colaborador: {e}')
+            return False
+
+    @instrumentado
+    def upsert_colaborador(self, colaborador):
+        '''
+        Crea el colaborador o, si el DNI ya existe, reemplaza todos sus datos (incluido el subtipo:
+        si pasa de tiempo completo a parcial se borra la fila del otro subtipo).
+        Todo en una transacción, sin consultar antes si existe (INSERT ... ON DUPLICATE KEY / ON CONFLICT).
+        En el log de cambios queda como 'crear' con todos los datos.
+        Sólo acepta colaboradores de tiempo completo o parcial (devuelve False con cualquier otro tipo)
+        '''
+        if isinstance(colaborador, ColaboradorTiempoCompleto):
+            tabla, columna, valor, otra = 'colaboradortiempocompleto', 'departamento', colaborador.departamento, 'colaboradortiempoparcial'
+        elif isinstance(colaborador, ColaboradorTiempoParcial):
+            tabla, columna, valor, otra = 'colaboradortiempoparcial', 'horas_semanales', colaborador.horas_semanales, 'colaboradortiempocompleto'
+        else:
+            print(f'No se puede guardar un {type(colaborador).__name__}: debe ser de tiempo completo o parcial')
+            return False
+        try:
+            with self._conexion() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(self.backend.upsert('colaboradores', ('dni', 'nombre', 'apellido', 'edad', 'salario')),
+                                   (colaborador.dni, colaborador.nombre, colaborador.apellido, colaborador.edad, colaborador.salario))
+                    cursor.execute(self.backend.upsert(tabla, ('dni', columna)), (colaborador.dni, valor))
+                    cursor.execute(f'DELETE FROM {otra} WHERE dni = %s', (colaborador.dni,))
+                    self._registrar_cambios([(colaborador.dni, 'crear', colaborador.to_dict())])
+                    self._confirmar(connection)
+        except Exception as e:
+            print(f'Error al guardar el colaborador: {e}')
+            return False
+
+        self.cache.invalidar(colaborador.dni)
+        for indice in self.indices: ### El nombre o el apellido pueden haber cambiado
+            indice.quitar(colaborador.dni)
+            indice.agregar(colaborador)
+        print(f'Colaborador {colaborador.nombre} {colaborador.apellido} guardado con éxito')
+        return True
 
+    def _clave_cache(self, dni):
+        '''
+        El DNI llega como texto desde el menú o como número desde el código: se normaliza
+        para que '12345678' y 12345678 sean la misma entrada del cache
+        '''
+        try:
+            return int(dni)
+        except (TypeError, ValueError):
+            return None
+
+    @instrumentado
     def leer_colaborador(self, dni):
         '''
         Método para buscar el colaborador mediante CRUD
+        Primero se busca en el cache y, si no está, se consulta la BBDD y se guarda el resultado
+        (también si no existe). Devuelve el colaborador o None
         '''
         try:
-            '''
-            Hace una consulta con un DNI dado
-            Si la encuentro, crea una variable para guardar los datos 
-            Evalua si está presente departamento, si es así, crea una 
-            instancia de ColaboradorTiempoCompleto
-            '''
-            connection = self.connect()
-            if connection:
-                with connection.cursor(dictionary=True) as cursor: ### Cuando el cursor devuelve la consulta lo hará en formato diccionario
-                    cursor.execute('SELECT * FROM colaboradores WHERE dni = %s', (dni,)) ### Para que Python "entienda" que es una estructura de datos tipo tupla de un solo elemento se le agrega ","
-                    colaborador_data = cursor.fetchone()
-
-                    if colaborador_data:
-                        cursor.execute('SELECT departamento FROM colaboradortiempocompleto WHERE dni = %s', (dni,))
-                        departamento = cursor.fetchone()
-
-                        if departamento:
-                            colaborador_data['departamento'] = departamento['departamento'] ### Agrega al diccionario del colaborador la información 'departamento' si la hubiese (consulta anterior)
-                            colaborador = ColaboradorTiempoCompleto(**colaborador_data) ### Pasamos todos los datos para instanciar un colaborador
-                        else: ### Quiere decir que es de tiempo parcial
-                            cursor.execute('SELECT horas_semanales FROM colaboradortiempoparcial WHERE dni = %s', (dni,))
-                            horas_semanales = cursor.fetchone()
-                            if horas_semanales:
-                                colaborador_data['horas_semanales'] = horas_semanales['horas_semanales'] ### Agrega al diccionario del colaborador la información 'departamento' si la hubiese (consulta anterior)
-                                colaborador = ColaboradorTiempoParcial(**colaborador_data)
-                            else:
-                                colaborador = Colaborador(**colaborador_data)
-                        print(f'Colaborador encontrado: {colaborador}')
-                    else:
-                        print(f'No se encontró el colaborador con DNI: {dni}')
-        except Error as e:
+            colaborador = self._buscar_colaborador(dni)
+        except Exception as e:
             print(f'Error al leer colaborador: {e}')
-        finally:
-            if connection.is_connected():
-                connection.close()
+            return None
+
+        if colaborador:
+            print(f'Colaborador encontrado: {colaborador}')
+        else:
+            print(f'No se encontró el colaborador con DNI: {dni}')
+        return colaborador
+
+    def _buscar_colaborador(self, dni):
+        '''
+        Lo que hace leer_colaborador pero sin imprimir ni atrapar los errores de la BBDD:
+        devuelve None sólo si el colaborador no existe (el modo batch necesita distinguirlo de un error)
+        '''
+        clave = self._clave_cache(dni)
+        if clave is not None:
+            encontrado, fila = self.cache.obtener(clave)
+            if encontrado:
+                return self._colaborador_desde_fila(dict(fila)) if fila else None ### Instancia nueva en cada acierto
+
+        '''
+        Hace una consulta con un DNI dado, trayendo en la misma consulta (LEFT JOIN)
+        el departamento o las horas semanales según el tipo de colaborador
+        '''
+        with self._conexion() as connection:
+            with connection.cursor(dictionary=True) as cursor: ### Cuando el cursor devuelve la consulta lo hará en formato diccionario
+                cursor.execute(f'{CONSULTA_COLABORADORES} WHERE c.dni = %s', (dni,)) ### Para que Python "entienda" que es una estructura de datos tipo tupla de un solo elemento se le agrega ","
+                colaborador_data = cursor.fetchone()
+
+        if clave is not None:
+            self.cache.guardar(clave, colaborador_data)
+        return self._colaborador_desde_fila(colaborador_data) if colaborador_data else None
 
+    def estadisticas_cache(self):
+        '''
+        Aciertos, fallos, desalojos e invalidaciones del cache de lecturas por DNI
+        '''
+        return self.cache.estadisticas()
+
+    @instrumentado
     def actualizar_colaborador(self, dni, nuevo_salario):
         '''
         Actualizar el salario del colaborador en la BBDD
         '''
         try:
-            connection = self.connect()
-            if  connection: ### Chequeamos que exista la conexión
+            with self._conexion() as connection:
                 with connection.cursor() as cursor:
                     ### Verificar si existe DNI
                     cursor.execute('SELECT * FROM colaboradores WHERE dni = %s', (dni,))
                     if not cursor.fetchone(): ### Si no se encontró información es porque no existe ese DNI
                         print(f'No se encontró colaborador con DNI: {dni}')
-                        return
+                        return False
                     
                     ### Actualizar el salario (si encuentra)
                     cursor.execute('UPDATE colaboradores SET salario = %s WHERE dni = %s', (nuevo_salario, dni))
 
                     if cursor.rowcount > 0: ### Si no tiene filas vacías es porque encontró un dato (es una validación)
-                        connection.commit()
+                        self._registrar_cambios([(dni, 'actualizar', {'salario': float(nuevo_salario)})])
+                        self._confirmar(connection)
+                        self.cache.invalidar(self._clave_cache(dni))
                         print(f'El nuevo salario {nuevo_salario} se actualizó correctamente para el colaborador con DNI {dni}')
+                        return True
                     else:
                         print(f'No se encontró colaborador con DNI {dni}')
+                        return False
 
         except Exception as e:
             print(f'Error al actualizar el colaborador: {e}')
-        finally:
-            if connection.is_connected():
-                connection.close()
+            return False
 
+    @instrumentado
     def eliminar_colaborador(self, dni):
+        '''
+        Un solo DELETE: las filas del subtipo se borran en cascada (ON DELETE CASCADE)
+        y rowcount indica si el DNI existía
+        '''
         try:
-            connection = self.connect()
-            if connection:
+            with self._conexion() as connection:
                 with connection.cursor() as cursor:
-                    ### Verificar si existe el DNI
-                    cursor.execute('SELECT * FROM colaboradores WHERE dni = %s', (dni,))
-                    if not cursor.fetchone():
-                        print(f'No se encontró colaborador con DNI {dni}')
-                        return 
-                    
-                    ### Eliminar colaborador
-                    cursor.execute('DELETE FROM colaboradortiempocompleto WHERE dni = %s', (dni,))
-                    cursor.execute('DELETE FROM colaboradortiempoparcial WHERE dni = %s', (dni,))
                     cursor.execute('DELETE FROM colaboradores WHERE dni = %s', (dni,))
-                    
+
                     if cursor.rowcount > 0: ### Retorna la respuesta a la última consulta realizada
-                        connection.commit()
+                        self._registrar_cambios([(dni, 'eliminar', None)])
+                        self._confirmar(connection)
+                        self.cache.invalidar(self._clave_cache(dni))
+                        for indice in self.indices:
+                            indice.quitar(self._clave_cache(dni))
                         print(f'El colaborador con DNI {dni} se eliminó correctamente')
+                        return True
                     else:
                         print(f'No se encontró colaborador con el siguiente DNI: {dni}')
+                        return False
         except Exception as e:
             print(f'Error al eliminar el colaborador: {e}')
-        finally:
-            if connection.is_connected():
-                connection.close()
+            return False
         
-    def leer_todos_los_colaboradores(self):
+    def _colaborador_desde_registro(self, registro):
+        '''
+        Convierte un registro de importación (diccionario leído de CSV/JSON) en una instancia
+        de la subclase que corresponda. La validación de DNI y salario la hace el constructor
+        '''
+        if isinstance(registro, Colaborador):
+            return registro
+        if isinstance(registro, RegistroInvalido):
+            raise ValueError(registro.motivo)
+        if not isinstance(registro, dict):
+            raise TypeError(f'El registro debe ser un objeto con los datos del colaborador, no {type(registro).__name__}')
+        ### En un CSV las columnas que no aplican llegan como cadenas vacías
+        datos = {clave: (valor.strip() if isinstance(valor, str) else valor) for clave, valor in registro.items()}
+        departamento = datos.get('departamento') or None
+        horas_semanales = datos.get('horas_semanales') or None
+        if departamento is not None and horas_semanales is not None:
+            raise ValueError('El colaborador no puede tener departamento y horas semanales a la vez')
+        comunes = (datos.get('dni'), datos.get('nombre'), datos.get('apellido'), int(datos.get('edad')), datos.get('salario'))
+        if not comunes[1] or not comunes[2]:
+            raise ValueError('El nombre y el apellido son obligatorios')
+        if departamento is not None:
+            return ColaboradorTiempoCompleto(*comunes, departamento)
+        if horas_semanales is not None:
+            return ColaboradorTiempoParcial(*comunes, int(horas_semanales))
+        raise ValueError('Debe indicarse departamento (tiempo completo) u horas semanales (tiempo parcial)')
+
+    @staticmethod
+    def _dni_de_registro(registro):
+        '''
+        DNI de un registro de importación para el reporte de rechazos (None si el registro no lo tiene)
+        '''
+        if isinstance(registro, Colaborador):
+            return registro.dni
+        return registro.get('dni') if isinstance(registro, dict) else None
+
+    @instrumentado
+    def crear_colaboradores_bulk(self, registros, tamano_lote=None):
+        '''
+        Carga masiva de colaboradores (por ej. los lotes mensuales de RRHH).
+        Recibe cualquier iterable de diccionarios o instancias de Colaborador y lo consume de a
+        tamano_lote registros: valida cada uno, descarta los DNI que ya existen y los inserta con
+        executemany en las tres tablas, con una transacción por lote.
+        Los registros inválidos o duplicados no cortan la carga: se informan en el reporte
+        {'insertados': int, 'rechazados': [{'registro': n, 'dni': ..., 'motivo': ...}]}
+        '''
+        if tamano_lote is None:
+            tamano_lote = config('DB_BATCH_SIZE', default=1000, cast=int)
+        reporte = {'insertados': 0, 'rechazados': []}
+
+        def rechazar(numero, dni, motivo):
+            reporte['rechazados'].append({'registro': numero, 'dni': dni, 'motivo': motivo})
+
+        numerados = enumerate(registros, start=1)
+        while True:
+            lote = list(itertools.islice(numerados, tamano_lote))
+            if not lote:
+                break
+
+            ### Validación en memoria, antes de tocar la BBDD
+            validos = {}
+            for numero, registro in lote:
+                dni = self._dni_de_registro(registro)
+                try:
+                    colaborador = self._colaborador_desde_registro(registro)
+                except (ValueError, TypeError) as e:
+                    rechazar(numero, dni, str(e))
+                    continue
+                if colaborador.dni in validos:
+                    rechazar(numero, colaborador.dni, 'DNI duplicado en el archivo')
+                    continue
+                validos[colaborador.dni] = (numero, colaborador)
+            if not validos:
+                continue
+
+            try:
+                with self._conexion() as connection:
+                    with connection.cursor() as cursor:
+                        ### Una sola consulta por lote para detectar los DNI que ya existen
+                        marcadores = ', '.join(['%s'] * len(validos))
+                        cursor.execute(f'SELECT dni FROM colaboradores WHERE dni IN ({marcadores})', tuple(validos))
+                        for (dni,) in cursor.fetchall():
+                            numero, _ = validos.pop(dni)
+                            rechazar(numero, dni, 'Ya existe un colaborador con ese DNI')
+                        if not validos:
+                            continue
+
+                        colaboradores = [colaborador for _, colaborador in validos.values()]
+                        cursor.executemany('''
+                        INSERT INTO colaboradores (dni, nombre, apellido, edad, salario)
+                        VALUES (%s, %s, %s, %s, %s)
+                        ''', [(c.dni, c.nombre, c.apellido, c.edad, c.salario) for c in colaboradores])
+
+                        tiempo_completo = [(c.dni, c.departamento) for c in colaboradores if isinstance(c, ColaboradorTiempoCompleto)]
+                        if tiempo_completo:
+                            cursor.executemany('INSERT INTO colaboradortiempocompleto (dni, departamento) VALUES (%s, %s)', tiempo_completo)
+
+                        tiempo_parcial = [(c.dni, c.horas_semanales) for c in colaboradores if isinstance(c, ColaboradorTiempoParcial)]
+                        if tiempo_parcial:
+                            cursor.executemany('INSERT INTO colaboradortiempoparcial (dni, horas_semanales) VALUES (%s, %s)', tiempo_parcial)
+
+                        self._registrar_cambios([(c.dni, 'crear', c.to_dict()) for c in colaboradores])
+                        self._confirmar(connection)
+                        reporte['insertados'] += len(colaboradores)
+                        for colaborador in colaboradores:
+                            self.cache.invalidar(colaborador.dni)
+                        for indice in self.indices:
+                            indice.agregar(colaboradores)
+            except Exception as e:
+                ### El pool hace rollback de la transacción del lote al devolver la conexión
+                for dni, (numero, _) in validos.items():
+                    rechazar(numero, dni, f'Error al insertar el lote: {e}')
+
+        return reporte
+
+    def _colaborador_desde_fila(self, fila):
+        '''
+        Instancia el colaborador que corresponde a una fila de la consulta con LEFT JOIN:
+        si vino departamento es de tiempo completo, si vinieron horas es de tiempo parcial
+        '''
+        departamento = fila.pop('departamento', None)
+        horas_semanales = fila.pop('horas_semanales', None)
+        if departamento is not None:
+            return ColaboradorTiempoCompleto(**fila, departamento=departamento)
+        if horas_semanales is not None:
+            return ColaboradorTiempoParcial(**fila, horas_semanales=horas_semanales)
+        return Colaborador(**fila)
+
+    def _leer_filas(self, tamano_lote=1000, dictionary=True):
+        '''
+        Generador que devuelve las filas crudas (sin instanciar colaboradores) de a tamano_lote por vez.
+        Se resuelve el tipo de colaborador en una única consulta (LEFT JOIN contra las dos tablas
+        de subtipos) en lugar de hacer una o dos consultas extra por cada fila.
+        El cursor no es buffered, así que fetchmany va trayendo las filas del servidor a medida que se piden.
+        Con dictionary=False las filas son tuplas en el orden de CONSULTA_COLABORADORES
+        '''
+        with self._conexion() as connection:
+            with connection.cursor(dictionary=dictionary) as cursor:
+                cursor.execute(CONSULTA_COLABORADORES)
+                try:
+                    while True:
+                        filas = cursor.fetchmany(tamano_lote)
+                        if not filas:
+                            break
+                        yield filas
+                finally:
+                    ### Si se dejó de iterar antes de terminar quedan filas sin leer en el servidor
+                    if connection.unread_result:
+                        connection.consume_results()
+
+    @instrumentado
+    def leer_colaboradores_paralelo(self, tamano_lote=1000, trabajadores=None, procesos=False):
+        '''
+        Generador como leer_todos_los_colaboradores pero para cargas grandes: un hilo lector va
+        trayendo lotes con fetchmany y los reparte a un pool de trabajadores (HYDRATION_WORKERS,
+        por defecto uno por CPU) que los validan e instancian mientras se lee el lote siguiente.
+        Los colaboradores se devuelven en el mismo orden que la consulta. Hay como máximo
+        2 * trabajadores lotes en vuelo, así la memoria no depende del tamaño de la tabla.
+        Con procesos=True se usa un ProcessPoolExecutor: paraleliza la construcción de verdad
+        (sin el GIL) a cambio de serializar los lotes entre procesos
+        '''
+        if trabajadores is None:
+            trabajadores = config('HYDRATION_WORKERS', default=os.cpu_count() or 1, cast=int)
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+        if procesos:
+            executor = ProcessPoolExecutor(max_workers=trabajadores)
+        else:
+            executor = ThreadPoolExecutor(max_workers=trabajadores, thread_name_prefix='hidratacion')
+        en_vuelo = queue.Queue(maxsize=2 * trabajadores) ### Futuros en el orden de lectura (o el error del lector)
+        detener = threading.Event()
+
+        def entregar(elemento):
+            while not detener.is_set():
+                try:
+                    en_vuelo.put(elemento, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def leer():
+            lotes = self._leer_filas(tamano_lote, dictionary=False)
+            try:
+                for filas in lotes:
+                    if not entregar(executor.submit(hidratar_lote, filas)):
+                        return
+                entregar(None)
+            except BaseException as e:
+                entregar(e)
+            finally:
+                lotes.close() ### Devuelve la conexión al pool aunque se corte la lectura
+
+        ### El hilo lector corre en una copia del contexto para que sus consultas se atribuyan a esta operación
+        lector = threading.Thread(target=contextvars.copy_context().run, args=(leer,), name='lector_colaboradores', daemon=True)
+        lector.start()
+        try:
+            while True:
+                elemento = en_vuelo.get()
+                if elemento is None:
+                    break
+                if isinstance(elemento, BaseException):
+                    raise elemento
+                yield from elemento.result()
+        finally:
+            detener.set()
+            lector.join()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _leer_lotes(self, tamano_lote=1000):
+        '''
+        Generador que devuelve listas de colaboradores de a tamano_lote por vez
+        '''
+        for filas in self._leer_filas(tamano_lote):
+            yield [self._colaborador_desde_fila(fila) for fila in filas]
+
+    def _actualizar_salarios_lote(self, cursor, salarios):
+        '''
+        Actualiza el salario de varios colaboradores con un único UPDATE (CASE por DNI)
+        en lugar de un UPDATE por colaborador. salarios es una lista de tuplas (dni, salario)
+        '''
+        casos = ' '.join(['WHEN %s THEN %s'] * len(salarios))
+        marcadores = ', '.join(['%s'] * len(salarios))
+        params = [valor for par in salarios for valor in par] + [dni for dni, _ in salarios]
+        cursor.execute(f'UPDATE colaboradores SET salario = CASE dni {casos} END WHERE dni IN ({marcadores})', params)
+
+    @instrumentado
+    def actualizar_salarios(self, salarios, tamano_lote=None):
+        '''
+        Actualización masiva de salarios (por ej. el aumento anual de todo el padrón).
+        Recibe un diccionario {dni: nuevo_salario} o un iterable de tuplas (dni, nuevo_salario).
+        Cada salario se valida antes de tocar la BBDD; después se procesan de a tamano_lote DNI,
+        con una transacción por lote (si falla, se hace rollback sólo de ese lote).
+        En vez de imprimir devuelve un reporte {dni: estado} con estado 'actualizado',
+        'no encontrado', 'invalido' o 'error'. Las claves del reporte son los DNI
+        tal como los pasó quien llama (por ej. '12345678' sigue siendo una cadena).
+        Si un DNI aparece más de una vez sólo se aplica la primera, que es la que queda en el reporte;
+        las repeticiones no se aplican y se listan, en el orden en que llegaron, en reporte['duplicados']
+        '''
+        if tamano_lote is None:
+            tamano_lote = config('DB_BATCH_SIZE', default=1000, cast=int)
+        if isinstance(salarios, dict):
+            salarios = salarios.items()
+        reporte = {}
+        duplicados = []
+        vistos = set() ### DNI ya normalizados, para detectar repetidos entre lotes también
+
+        pares = iter(salarios)
+        while True:
+            lote = list(itertools.islice(pares, tamano_lote))
+            if not lote:
+                break
+
+            validos = {} ### dni normalizado -> (clave original, salario)
+            for clave, salario in lote:
+                try:
+                    dni = Colaborador.validar_dni(clave)
+                    nuevo_salario = Colaborador.validar_salario(salario)
+                except (ValueError, TypeError):
+                    if clave in reporte: ### La misma clave inválida otra vez
+                        duplicados.append(clave)
+                    else:
+                        reporte[clave] = 'invalido'
+                    continue
+                if dni in vistos:
+                    duplicados.append(clave)
+                    continue
+                vistos.add(dni)
+                validos[dni] = (clave, nuevo_salario)
+            if not validos:
+                continue
+
+            try:
+                with self._conexion() as connection:
+                    with connection.cursor() as cursor:
+                        ### Se buscan los existentes porque MySQL no cuenta como afectada una fila cuyo salario no cambia
+                        marcadores = ', '.join(['%s'] * len(validos))
+                        cursor.execute(f'SELECT dni FROM colaboradores WHERE dni IN ({marcadores})', tuple(validos))
+                        existentes = {dni for (dni,) in cursor.fetchall()}
+                        if existentes:
+                            self._actualizar_salarios_lote(cursor, [(dni, validos[dni][1]) for dni in existentes])
+                            self._registrar_cambios([(dni, 'actualizar', {'salario': validos[dni][1]}) for dni in existentes])
+                    self._confirmar(connection)
+            except Exception:
+                ### El pool hace rollback de la transacción del lote al devolver la conexión
+                existentes = None
+
+            for dni, (clave, _) in validos.items():
+                if existentes is None:
+                    reporte[clave] = 'error'
+                    continue
+                reporte[clave] = 'actualizado' if dni in existentes else 'no encontrado'
+                self.cache.invalidar(dni)
+        reporte['duplicados'] = duplicados
+        return reporte
+
+    @instrumentado
+    def buscar_colaboradores(self, apellido=None, nombre=None, departamento=None, edad_min=None, edad_max=None,
+                             salario_min=None, salario_max=None, despues_de=None, limite=50):
+        '''
+        Búsqueda por prefijo de apellido y/o nombre, departamento exacto y rangos de edad y salario.
+        Los resultados vienen ordenados por apellido y DNI y paginados por "keyset": en lugar de OFFSET
+        (que obliga a la BBDD a recorrer todas las filas anteriores) se pide la página que sigue a la
+        última fila vista, así las páginas profundas cuestan lo mismo que la primera.
+        Devuelve (colaboradores, siguiente); para la página siguiente se pasa despues_de=siguiente,
+        que es None cuando no hay más resultados
+        '''
+        condiciones, params = [], []
+        for columna, prefijo in (('c.apellido', apellido), ('c.nombre', nombre)):
+            if prefijo:
+                ### Cada motor arma la condición que usa el índice (ver backend.prefijo)
+                condicion, valores = self.backend.prefijo(columna, prefijo.capitalize()) ### Los nombres se guardan normalizados así (ver Colaborador)
+                condiciones.append(condicion)
+                params += valores
+        if departamento is not None:
+            condiciones.append('tc.departamento = %s')
+            params.append(departamento)
+        for condicion, valor in (('c.edad >= %s', edad_min), ('c.edad <= %s', edad_max),
+                                 ('c.salario >= %s', salario_min), ('c.salario <= %s', salario_max)):
+            if valor is not None:
+                condiciones.append(condicion)
+                params.append(valor)
+        if despues_de is not None:
+            ultimo_apellido, ultimo_dni = despues_de
+            condiciones.append('(c.apellido > %s OR (c.apellido = %s AND c.dni > %s))')
+            params += [ultimo_apellido, ultimo_apellido, ultimo_dni]
+
+        query = CONSULTA_COLABORADORES
+        if condiciones:
+            query += ' WHERE ' + ' AND '.join(condiciones)
+        query += ' ORDER BY c.apellido, c.dni LIMIT %s'
+        params.append(limite + 1) ### Una fila de más para saber si hay otra página
+
+        with self._conexion() as connection:
+            with connection.cursor(dictionary=True) as cursor:
+                cursor.execute(query, params)
+                filas = cursor.fetchall()
+
+        siguiente = None
+        if len(filas) > limite:
+            siguiente = (filas[limite - 1]['apellido'], filas[limite - 1]['dni'])
+        return [self._colaborador_desde_fila(fila) for fila in filas[:limite]], siguiente
+
+    def _registrar_cambios(self, cambios):
+        '''
+        Anota para el log de cambios una entrada por cada tupla (dni, operacion, datos).
+        Se escriben recién en _escribir_cambios, justo antes del commit de la misma transacción
+        '''
+        self._local.cambios.extend((dni, operacion, None if datos is None else json.dumps(datos))
+                                   for dni, operacion, datos in cambios)
+
+    def _escribir_cambios(self, connection):
+        '''
+        Inserta en el log los cambios anotados en la transacción, como última sentencia antes del commit.
+        Las secuencias salen del contador de cambios_secuencia y no de un AUTO_INCREMENT: el UPDATE
+        bloquea la fila del contador hasta el commit, así ninguna transacción toma una secuencia mientras
+        otra con una menor sigue sin confirmar. Quedan en el orden de los commits y quien lee el log no
+        se saltea un cambio que se confirma después de su lectura. Como el bloqueo se toma al final,
+        las escrituras concurrentes sólo se turnan para el commit y no durante toda la transacción
+        (y no puede haber un deadlock con las filas de colaboradores, que ya están bloqueadas)
+        '''
+        cambios = self._local.cambios
+        if not cambios:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE cambios_secuencia SET valor = valor + %s WHERE id = 1', (len(cambios),))
+            cursor.execute('SELECT valor FROM cambios_secuencia WHERE id = 1')
+            (ultima,) = cursor.fetchone()
+            cursor.executemany('INSERT INTO cambios_colaboradores (secuencia, dni, operacion, datos) VALUES (%s, %s, %s, %s)',
+                               [(secuencia, *cambio) for secuencia, cambio in enumerate(cambios, start=ultima - len(cambios) + 1)])
+        cambios.clear()
+
+    @instrumentado
+    def leer_cambios_desde(self, secuencia=0, limite=1000):
+        '''
+        Sincronización incremental: devuelve (en orden) hasta "limite" cambios posteriores a "secuencia",
+        como diccionarios {'secuencia', 'dni', 'operacion', 'datos'}. El consumidor guarda la secuencia
+        del último cambio que procesó y la usa en la próxima llamada.
+        Si pide desde antes de la última compactación recibe también el estado compactado de cada DNI
+        (que conserva la secuencia de su último cambio), así que nunca se pierde una modificación.
+        Operaciones: 'crear' (datos = to_dict()), 'actualizar' (datos = campos modificados) y 'eliminar'
+        '''
+        query = '''
+        SELECT secuencia, dni, operacion, datos FROM cambios_snapshot WHERE secuencia > %s
+        UNION ALL
+        SELECT secuencia, dni, operacion, datos FROM cambios_colaboradores WHERE secuencia > %s
+        ORDER BY secuencia
+        LIMIT %s
+        '''
+        with self._conexion() as connection:
+            with connection.cursor(dictionary=True) as cursor:
+                cursor.execute(query, (secuencia, secuencia, limite))
+                cambios = cursor.fetchall()
+        for cambio in cambios:
+            cambio['datos'] = None if cambio['datos'] is None else json.loads(cambio['datos'])
+        return cambios
+
+    @instrumentado
+    def compactar_cambios(self, hasta_secuencia=None):
+        '''
+        Pliega las entradas del log hasta hasta_secuencia (por defecto todas) en cambios_snapshot:
+        queda una sola fila por DNI con su estado acumulado ('crear' con todos los datos,
+        'actualizar' si sólo se conocen los campos modificados o 'eliminar') y la secuencia de su
+        último cambio. Luego se borran del log exactamente las entradas que se leyeron (no un rango),
+        así no se pierde ninguna que se confirme mientras tanto. Devuelve la cantidad de entradas plegadas
+        '''
+        with self._conexion() as connection:
+            with connection.cursor(dictionary=True) as cursor:
+                if hasta_secuencia is None:
+                    cursor.execute('SELECT MAX(secuencia) AS secuencia FROM cambios_colaboradores')
+                    hasta_secuencia = cursor.fetchone()['secuencia']
+                    if hasta_secuencia is None:
+                        return 0
+                cursor.execute('SELECT secuencia, dni, operacion, datos FROM cambios_colaboradores '
+                               'WHERE secuencia <= %s ORDER BY secuencia', (hasta_secuencia,))
+                entradas = cursor.fetchall()
+                if not entradas:
+                    return 0
+
+                ### Se parte del estado ya compactado de cada DNI afectado
+                estados = {}
+                dnis = list({entrada['dni'] for entrada in entradas})
+                for inicio in range(0, len(dnis), 1000):
+                    parte = dnis[inicio:inicio + 1000]
+                    marcadores = ', '.join(['%s'] * len(parte))
+                    cursor.execute(f'SELECT dni, secuencia, operacion, datos FROM cambios_snapshot WHERE dni IN ({marcadores})', parte)
+                    for fila in cursor.fetchall():
+                        estados[fila['dni']] = [fila['secuencia'], fila['operacion'],
+                                                None if fila['datos'] is None else json.loads(fila['datos'])]
+
+                for entrada in entradas:
+                    datos = None if entrada['datos'] is None else json.loads(entrada['datos'])
+                    estado = estados.get(entrada['dni'])
+                    if entrada['operacion'] == 'actualizar' and estado is not None and estado[1] != 'eliminar':
+                        estado[2].update(datos) ### Se aplica la modificación sobre el estado anterior
+                        estado[0] = entrada['secuencia']
+                    else:
+                        estados[entrada['dni']] = [entrada['secuencia'], entrada['operacion'], datos]
+
+                for inicio in range(0, len(dnis), 1000):
+                    parte = dnis[inicio:inicio + 1000]
+                    marcadores = ', '.join(['%s'] * len(parte))
+                    cursor.execute(f'DELETE FROM cambios_snapshot WHERE dni IN ({marcadores})', parte)
+                cursor.executemany('INSERT INTO cambios_snapshot (dni, secuencia, operacion, datos) VALUES (%s, %s, %s, %s)',
+                                   [(dni, secuencia, operacion, None if datos is None else json.dumps(datos))
+                                    for dni, (secuencia, operacion, datos) in estados.items()])
+                secuencias = [entrada['secuencia'] for entrada in entradas]
+                for inicio in range(0, len(secuencias), 1000):
+                    parte = secuencias[inicio:inicio + 1000]
+                    marcadores = ', '.join(['%s'] * len(parte))
+                    cursor.execute(f'DELETE FROM cambios_colaboradores WHERE secuencia IN ({marcadores})', parte)
+            self._confirmar(connection)
+        return len(entradas)
+
+    def _leer_proxies(self, tamano_lote, columnas):
+        '''
+        Generador de proxies (ColaboradorDiferido) con sólo las columnas pedidas;
+        las demás quedan pendientes en una CargaDiferida por lote, que sólo referencian los proxies de
+        ese lote: cuando quien recorre el listado los suelta se libera también lo pendiente, así la
+        memoria no crece con el tamaño de la tabla aunque nunca se use un atributo diferido.
+        Cada lote se trae con su propia consulta paginada por DNI y la conexión vuelve al pool antes de
+        entregarlo, así la carga diferida puede usarla aunque el pool tenga una sola conexión (o dentro
+        de una transaccion()). Los proxies de un lote se crean todos antes de entregar el primero:
+        el primer atributo pendiente que se use carga el lote entero y no sólo ese colaborador
+        '''
+        columnas = tuple(columna for columna in ATRIBUTOS_DIFERIBLES if columna in columnas) ### Orden fijo => consulta cacheada
+        faltantes = [columna for columna in ATRIBUTOS_DIFERIBLES if columna not in columnas]
+        consulta = consulta_proyectada(columnas)
+        ultimo_dni = 0 ### Los DNI son positivos (ver Colaborador.validar_dni)
+        while True:
+            with self._conexion() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(consulta, (ultimo_dni, tamano_lote))
+                    filas = cursor.fetchall()
+            carga = CargaDiferida(self, faltantes, 'leer_todos_los_colaboradores') if faltantes else None
+            lote = []
+            for dni, *valores, departamento, horas_semanales in filas:
+                valores = zip(columnas, valores)
+                if departamento is not None:
+                    lote.append(ColaboradorTiempoCompletoDiferido._crear(carga, dni, valores, departamento))
+                elif horas_semanales is not None:
+                    lote.append(ColaboradorTiempoParcialDiferido._crear(carga, dni, valores, horas_semanales))
+                else:
+                    lote.append(ColaboradorSinSubtipoDiferido._crear(carga, dni, valores))
+            yield from lote
+            if len(filas) < tamano_lote:
+                return
+            ultimo_dni = filas[-1][0]
+
+    @instrumentado
+    def leer_todos_los_colaboradores(self, tamano_lote=1000, columnas=None):
+        '''
+        Generador: devuelve los colaboradores de a uno a medida que llegan de la BBDD,
+        así el listado empieza a mostrarse enseguida y no se guarda toda la tabla en memoria.
+        Con columnas (por ej. ('apellido',)) la consulta trae sólo esas columnas, además del dni y
+        los datos del subtipo, y devuelve proxies ordenados por DNI: el resto de los atributos (nombre,
+        apellido, edad, salario) se carga recién si se usa, en una consulta por lote de tamano_lote
+        (hasta 1000 colaboradores pendientes por consulta)
+        '''
+        if columnas is not None:
+            desconocidas = set(columnas) - set(ATRIBUTOS_DIFERIBLES) - {'dni', 'departamento', 'horas_semanales'}
+            if desconocidas:
+                raise ValueError(f'Columnas desconocidas: {", ".join(sorted(desconocidas))}')
         try:
-            connection = self.connect()
-            if connection:
-                with connection.cursor(dictionary=True) as cursor:
-                    cursor.execute('SELECT * FROM colaboradores')
-                    colaboradores_data = cursor.fetchall()
-                    colaboradores = []
-                    for colaborador_data in colaboradores_data:
-                        dni = colaborador_data['dni']
-                        cursor.execute('SELECT departamento FROM colaboradortiempocompleto WHERE dni = %s', (dni,))
-                        departamento = cursor.fetchone()
-                        if departamento:
-                            colaborador_data['departamento'] = departamento['departamento']
-                            colaborador = ColaboradorTiempoCompleto(**colaborador_data)
-                        else:
-                            cursor.execute('SELECT horas_semanales FROM colaboradortiempoparcial WHERE dni = %s', (dni,))
-                            horas_semanales = cursor.fetchone()
-                            colaborador_data['horas_semanales'] = horas_semanales['horas_semanales']
-                            colaborador = ColaboradorTiempoParcial(**colaborador_data)
-                        colaboradores.append(colaborador)
+            if columnas is None:
+                for lote in self._leer_lotes(tamano_lote):
+                    yield from lote
+            else:
+                yield from self._leer_proxies(tamano_lote, columnas)
         except Exception as e:
             print(f'Error al mostrar los colaboradores: {e}')
-        else:
-            return colaboradores
+
+#Gestion asincrónica
+class AsyncGestionColaboradores:
+    '''
+    Variante asincrónica de GestionColaboradores con los mismos métodos CRUD (pero con await).
+    El driver de MySQL es bloqueante, así que cada operación corre en un ThreadPoolExecutor
+    con tantos hilos como conexiones tiene el pool: el event loop no se bloquea y se pueden
+    atender muchas consultas a la vez, por ej.
+        await asyncio.gather(*(gestion.leer_colaborador(dni) for dni in dnis))
+    Se le puede pasar una instancia de GestionColaboradores ya configurada (por ej. contra una BBDD local de prueba)
+    '''
+    def __init__(self, gestion=None, trabajadores=None) -> None:
+        self.gestion = gestion if gestion is not None else GestionColaboradores()
+        if trabajadores is None:
+            trabajadores = self.gestion.estadisticas_pool()['tamano']
+        from concurrent.futures import ThreadPoolExecutor
+        self.__executor = ThreadPoolExecutor(max_workers=trabajadores, thread_name_prefix='gestion_colaboradores')
+
+    async def __ejecutar(self, funcion, *args):
+        import asyncio ### Ya está cargado: hay un event loop corriendo
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.__executor, functools.partial(funcion, *args))
+
+    async def crear_colaborador(self, colaborador):
+        return await self.__ejecutar(self.gestion.crear_colaborador, colaborador)
+
+    async def crear_colaboradores_bulk(self, registros, tamano_lote=None):
+        return await self.__ejecutar(self.gestion.crear_colaboradores_bulk, registros, tamano_lote)
+
+    async def leer_colaborador(self, dni):
+        return await self.__ejecutar(self.gestion.leer_colaborador, dni)
+
+    async def leer_colaboradores(self, dnis):
+        '''
+        Busca varios DNI en paralelo; devuelve los resultados en el mismo orden que los DNI
+        '''
+        import asyncio
+        return await asyncio.gather(*(self.leer_colaborador(dni) for dni in dnis))
+
+    async def actualizar_colaborador(self, dni, nuevo_salario):
+        return await self.__ejecutar(self.gestion.actualizar_colaborador, dni, nuevo_salario)
+
+    async def upsert_colaborador(self, colaborador):
+        return await self.__ejecutar(self.gestion.upsert_colaborador, colaborador)
+
+    async def eliminar_colaborador(self, dni):
+        return await self.__ejecutar(self.gestion.eliminar_colaborador, dni)
+
+    async def leer_todos_los_colaboradores(self, tamano_lote=1000):
+        '''
+        Generador asincrónico: async for colaborador in gestion.leer_todos_los_colaboradores()
+        Cada lote se trae en un hilo del executor, así el event loop sigue atendiendo otras tareas
+        '''
+        lotes = self.gestion._leer_lotes(tamano_lote)
+        try:
+            while True:
+                lote = await self.__ejecutar(next, lotes, None)
+                if lote is None:
+                    break
+                for colaborador in lote:
+                    yield colaborador
         finally:
-            if connection.is_connected():
-                connection.close()
\ No newline at end of file
+            await self.__ejecutar(lotes.close) ### Devuelve la conexión al pool si se corta la iteración
+
+    def estadisticas_pool(self):
+        return self.gestion.estadisticas_pool()
+
+    def estadisticas_cache(self):
+        return self.gestion.estadisticas_cache()
+
+    async def cerrar(self):
+        '''
+        Espera que terminen las operaciones en curso y cierra las conexiones libres
+        '''
+        import asyncio
+        await asyncio.get_running_loop().run_in_executor(None, self.__executor.shutdown)
+        self.gestion.pool.cerrar()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *excepcion):
+        await self.cerrar()